@@ -68,7 +68,9 @@ def graph_hunter_node(state: AgentState) -> AgentState:
     prompt = f"""
     Role: You are a Neo4j expert.
     Task: Based on the query '{state['query']}', generate a Cypher query to find relevant entities and relationships.
-    Schema: Nodes can be (:Person), (:Organization), (:Location). Relationships can be [:FAMILY], [:WORKS_FOR], [:LOCATED_IN].
+    Schema: Nodes can be (:Person), (:Organization), (:Location). Relationships can be [:FAMILY], [:WORKS_FOR], [:LOCATED_IN],
+    and [:CO_OCCURS_WITH] (entities named in the same documents; r.weight = number of shared documents),
+    and (:Document {{name}})-[:MENTIONS]->(entity) for every document an entity appears in.
     
     Example for "Who is related to Ahmed Ali?": MATCH (p1:Person {{name: "Ahmed Ali"}})-[r:FAMILY]-(p2:Person) RETURN p1, r, p2
     
@@ -0,0 +1,100 @@
+# backend/chunking.py
+# Semantic, token-aware text chunker shared by the ingestion stacks.
+# Mirrored in yemen_core_backend/chunking.py (each service builds from its own Docker context); keep the two in sync.
+
+import os
+import re
+from dataclasses import dataclass, asdict
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "384"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "48"))
+
+# Sentence ends in Latin and Arabic script (incl. Arabic question mark and full stop), or a line break
+_SENTENCE_END = re.compile(r"(?<=[.!?…؟۔])\s+|\n+")
+# Word-level token estimate; \w is Unicode-aware so Arabic words count like Latin ones
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+# Tatweel and bidi/zero-width marks carry nothing for retrieval and break exact matching
+_INVISIBLE = re.compile("[\u0640\u200b\u200d-\u200f\u202a-\u202e\u2066-\u2069]")
+
+def approx_token_count(text: str) -> int:
+    return len(_TOKEN.findall(text))
+
+@dataclass
+class Chunk:
+    ordinal: int
+    text: str
+    tokens: int
+    overlap_chars: int = 0 # leading characters repeated from the previous chunk
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+def _sentences(elements: Iterable) -> Iterator[Tuple[str, bool]]:
+    """Yields (sentence, starts_section) from `unstructured` elements or plain strings."""
+    for element in elements:
+        text = _INVISIBLE.sub("", str(element)).strip()
+        if not text:
+            continue
+        is_title = getattr(element, "category", None) == "Title"
+        for i, sentence in enumerate(part for part in _SENTENCE_END.split(text) if part.strip()):
+            yield " ".join(sentence.split()), is_title and i == 0
+
+def _fit(sentence: str, max_tokens: int, count_tokens: Callable[[str], int]) -> Iterator[Tuple[str, int]]:
+    """Cuts a sentence longer than `max_tokens` at word boundaries."""
+    tokens = count_tokens(sentence)
+    if tokens <= max_tokens:
+        yield sentence, tokens
+        return
+    piece, piece_tokens = [], 0
+    for word in sentence.split():
+        word_tokens = count_tokens(word)
+        if piece and piece_tokens + word_tokens > max_tokens:
+            yield " ".join(piece), piece_tokens
+            piece, piece_tokens = [], 0
+        piece.append(word)
+        piece_tokens += word_tokens
+    if piece:
+        yield " ".join(piece), piece_tokens
+
+def iter_chunks(elements: Iterable, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                count_tokens: Callable[[str], int] = approx_token_count) -> Iterator[Chunk]:
+    """Lazily packs sentences into chunks of at most `max_tokens`.
+
+    Chunks never cut a sentence unless it alone exceeds the limit, a Title element
+    always opens a new chunk, and consecutive chunks within a section share up to
+    `overlap_tokens` of trailing sentences.
+    """
+    current: List[Tuple[str, int]] = []
+    current_tokens, carried, ordinal = 0, 0, 0
+
+    def build(sentences, carried_count) -> Chunk:
+        overlap = " ".join(s for s, _ in sentences[:carried_count])
+        return Chunk(
+            ordinal=ordinal,
+            text=" ".join(s for s, _ in sentences),
+            tokens=sum(n for _, n in sentences),
+            overlap_chars=len(overlap) + 1 if overlap else 0
+        )
+
+    for sentence, starts_section in _sentences(elements):
+        for piece, tokens in _fit(sentence, max_tokens, count_tokens):
+            if len(current) > carried and (starts_section or current_tokens + tokens > max_tokens):
+                yield build(current, carried)
+                ordinal += 1
+                overlap, overlap_size = [], 0
+                if not starts_section:
+                    for previous in reversed(current):
+                        if overlap_size + previous[1] > overlap_tokens:
+                            break
+                        overlap.insert(0, previous)
+                        overlap_size += previous[1]
+                if overlap_size + tokens > max_tokens:
+                    overlap, overlap_size = [], 0
+                current, current_tokens, carried = overlap, overlap_size, len(overlap)
+            starts_section = False
+            current.append((piece, tokens))
+            current_tokens += tokens
+
+    if len(current) > carried:
+        yield build(current, carried)
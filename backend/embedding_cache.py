@@ -0,0 +1,90 @@
+# backend/embedding_cache.py
+# Content-addressed embedding cache shared by the ingestion paths.
+# Mirrored in yemen_core_backend/embedding_cache.py (each service builds from its own Docker context); keep the two in sync.
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Callable, List, Optional, Sequence
+import numpy as np
+
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.expanduser("~/.cache/raidan/embeddings.sqlite3"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "2000000"))
+
+class EmbeddingCache:
+    """Persistent (model, sha256(text)) -> float32 vector store with LRU eviction, backed by SQLite."""
+
+    def __init__(self, path: str = EMBED_CACHE_PATH, max_entries: int = EMBED_CACHE_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # WAL lets several actors/processes on one node share the file
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_lru ON embeddings(last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        keys = [self.key(model, text) for text in texts]
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+                self._db.execute(
+                    f"UPDATE embeddings SET last_used = ? WHERE key IN ({placeholders})", [time.time(), *batch]
+                )
+            self._db.commit()
+        return [np.frombuffer(found[k], dtype=np.float32) if k in found else None for k in keys]
+
+    def put_many(self, model: str, texts: Sequence[str], vectors) -> None:
+        now = time.time()
+        rows = [
+            (self.key(model, text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+            (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._db.commit()
+
+    def embed(self, model: str, texts: Sequence[str], compute: Callable[[List[str]], Sequence]) -> np.ndarray:
+        """Returns a float32 matrix for `texts`, calling `compute` only for the cache misses."""
+        cached = self.get_many(model, texts)
+        misses = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if misses:
+            fresh = dict(zip(misses, np.asarray(compute(misses), dtype=np.float32)))
+            self.put_many(model, misses, [fresh[text] for text in misses])
+            cached = [vector if vector is not None else fresh[text] for text, vector in zip(texts, cached)]
+        if not cached:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(cached)
+
+    def close(self):
+        self._db.close()
@@ -7,15 +7,21 @@ import pty
 import json
 import subprocess
 import hashlib
+import zipfile
+import tempfile
+from contextlib import aclosing
 from typing import Dict, Any, List, Optional
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, UploadFile, File, WebSocket, WebSocketDisconnect, Request, Response
 from uuid import UUID
 from pathlib import Path
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
+import numpy as np
+import ray
+from ray.exceptions import RayActorError
 
 # --- Ray Integration ---
 try:
@@ -85,42 +91,269 @@ class ChatRequest(BaseModel):
 @app.post("/api/v1/ai/chat")
 async def chat_parallel(req: ChatRequest):
     """Refactored chat endpoint using Ray Actors for parallel scaling."""
-    actor = ray_manager.get_chat_actor()
-    if not actor:
+    pool = ray_manager.get_chat_pool()
+    if not pool:
         raise HTTPException(status_code=503, detail="AI Compute Cluster Offline")
     
     messages = req.context + [{"role": "user", "content": req.message}]
     
-    # Ray Actor call (Remote execution)
-    result_ref = actor.chat.remote(model=req.model, messages=messages)
-    
-    # Wait for result with timeout
+    # Ray Actor call (Remote execution) on the least-busy replica
     try:
-        import ray
-        result = await ray.get(result_ref)
-        if result["status"] == "error":
-            raise HTTPException(status_code=500, detail=result["message"])
-        return result
+        with pool.lease() as actor:
+            result = await actor.chat.remote(model=req.model, messages=messages)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Actor timeout or failure: {str(e)}")
 
+    if result["status"] == "error":
+        raise HTTPException(status_code=500, detail=result["message"])
+    return result
+
+# --- Token Streaming via Ray (SSE / WebSocket) ---
+async def _stream_chat_events(pool, req: ChatRequest):
+    """Yields the events of SovereignChatActor.chat_stream, holding a replica lease until done.
+
+    Use with `aclosing`: if the consumer stops early (client disconnected), the generation
+    is cancelled on the actor so it frees its Ollama slot along with the lease.
+    """
+    messages = req.context + [{"role": "user", "content": req.message}]
+    with pool.lease() as actor:
+        event_refs = actor.chat_stream.options(num_returns="streaming").remote(model=req.model, messages=messages)
+        finished = False
+        try:
+            async for event_ref in event_refs:
+                yield await event_ref
+            finished = True
+        finally:
+            if not finished:
+                ray.cancel(event_refs)
+
+@app.post("/api/v1/ai/chat/stream")
+async def chat_stream_sse(req: ChatRequest):
+    """Server-Sent Events variant of /api/v1/ai/chat: forwards tokens as they are generated."""
+    pool = ray_manager.get_chat_pool()
+    if not pool:
+        raise HTTPException(status_code=503, detail="AI Compute Cluster Offline")
+
+    async def event_source():
+        try:
+            async with aclosing(_stream_chat_events(pool, req)) as events:
+                async for event in events:
+                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'status': 'error', 'message': f'Actor failure: {str(e)}'})}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/api/v1/ai/chat/ws")
+async def chat_stream_ws(websocket: WebSocket):
+    """WebSocket variant: each inbound ChatRequest JSON is answered with a stream of token events."""
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                req = ChatRequest(**await websocket.receive_json())
+            except (ValueError, TypeError) as e:
+                await websocket.send_json({"status": "error", "message": f"Invalid chat request: {str(e)}"})
+                continue
+            pool = ray_manager.get_chat_pool()
+            if not pool:
+                await websocket.send_json({"status": "error", "message": "AI Compute Cluster Offline"})
+                continue
+            try:
+                async with aclosing(_stream_chat_events(pool, req)) as events:
+                    async for event in events:
+                        await websocket.send_json(event)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await websocket.send_json({"status": "error", "message": f"Actor failure: {str(e)}"})
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/api/v1/ai/pool")
+async def chat_pool_status():
+    """In-flight request count per chat replica."""
+    pool = ray_manager.get_chat_pool()
+    if not pool:
+        raise HTTPException(status_code=503, detail="AI Compute Cluster Offline")
+    return pool.stats()
+
 # --- Parallel Forensic Analysis via Ray ---
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+
+async def _upload_to_object_store(file: UploadFile):
+    """Streams an upload into one uint8 buffer and hands it to the Ray object store.
+
+    Workers resolve the returned ref as a read-only view of shared memory, so the
+    evidence bytes are never pickled or duplicated per actor.
+    """
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+
+    buffer = np.empty(size, dtype=np.uint8)
+    view = memoryview(buffer)
+    offset = 0
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        view[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    return ray.put(buffer[:offset])
+
 @app.post("/api/v1/forensics/analyze")
 async def forensic_parallel(file: UploadFile = File(...)):
     """Refactored forensic endpoint leveraging Ray for compute-heavy pixel analysis."""
-    actor = ray_manager.get_forensics_actor()
-    if not actor:
+    pool = ray_manager.get_forensics_pool()
+    if not pool:
         raise HTTPException(status_code=503, detail="Forensic Compute Cluster Offline")
     
-    file_content = await file.read()
+    image_ref = await _upload_to_object_store(file)
     
-    # Offload to Ray worker
-    import ray
-    result_ref = actor.run_ela_analysis.remote(file_content)
-    result = await ray.get(result_ref)
+    # Offload to Ray worker; the ref is resolved zero-copy on the actor side
+    with pool.lease() as actor:
+        result = await actor.run_ela_analysis.remote(image_ref)
     
     return result
 
+# --- Batch Forensic Analysis via Ray ---
+FORENSIC_BATCH_WINDOW = int(os.getenv("FORENSIC_BATCH_WINDOW", "16"))
+# tamper_score is the share of blocks in outlier regions (~0 on clean JPEGs); 0.02 flags an
+# image when at least 2% of it reads as re-compressed or pasted content
+FORENSIC_FLAG_THRESHOLD = float(os.getenv("FORENSIC_FLAG_THRESHOLD", "0.02"))
+# Largest single image accepted in a batch; ZIP members are checked against their declared size
+FORENSIC_MAX_IMAGE_BYTES = int(os.getenv("FORENSIC_MAX_IMAGE_BYTES", str(256 * 1024 * 1024)))
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp")
+
+def _stage_batch(files: List[UploadFile], scratch_dir: str) -> List[tuple]:
+    """Copies uploads to scratch space and lists the images in them as (filename, path, zip member, size).
+
+    Nothing is read into memory here; images enter the object store one by one as the window advances.
+    """
+    images = []
+    for i, file in enumerate(files):
+        path = os.path.join(scratch_dir, str(i))
+        file.file.seek(0)
+        with open(path, "wb") as staged:
+            shutil.copyfileobj(file.file, staged, UPLOAD_CHUNK_BYTES)
+        if (file.filename or "").lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and info.filename.lower().endswith(IMAGE_SUFFIXES):
+                        images.append((info.filename, path, info.filename, info.file_size))
+        else:
+            images.append((file.filename, path, None, os.path.getsize(path)))
+    return images
+
+def _staged_image_to_object_store(path: str, member: Optional[str], size: int):
+    """Reads one staged image (or ZIP member) into a uint8 buffer of at most `size` bytes and ray.puts it."""
+    buffer = np.empty(size, dtype=np.uint8)
+    view = memoryview(buffer)
+    offset = 0
+
+    def fill(stream):
+        nonlocal offset
+        while offset < size and (count := stream.readinto(view[offset:])):
+            offset += count
+
+    if member:
+        with zipfile.ZipFile(path) as archive, archive.open(member) as stream:
+            fill(stream)
+    else:
+        with open(path, "rb") as stream:
+            fill(stream)
+    return ray.put(buffer[:offset])
+
+@app.post("/api/v1/forensics/analyze/batch")
+async def forensic_batch(files: List[UploadFile] = File(...)):
+    """Fans many images (or ZIP archives of images) out across the forensic actor pool.
+
+    Results stream back as NDJSON, one line per image in completion order,
+    followed by a summary line ranking the images flagged as tampered.
+    """
+    pool = ray_manager.get_forensics_pool()
+    if not pool:
+        raise HTTPException(status_code=503, detail="Forensic Compute Cluster Offline")
+
+    scratch = tempfile.TemporaryDirectory(prefix="raidan-forensics-")
+    try:
+        images = await asyncio.to_thread(_stage_batch, files, scratch.name)
+    except zipfile.BadZipFile as e:
+        scratch.cleanup()
+        raise HTTPException(status_code=400, detail=f"Invalid ZIP archive: {e}")
+    if not images:
+        scratch.cleanup()
+        raise HTTPException(status_code=400, detail="No images found in request")
+
+    async def result_stream():
+        queue = iter(images)
+        pending = {} # result ref -> (filename, replica index, replica handle)
+        completed, errors, flagged = 0, 0, []
+        try:
+            while True:
+                # Backpressure: never more than FORENSIC_BATCH_WINDOW analyses in flight, and
+                # only their images in the object store at any time
+                while len(pending) < FORENSIC_BATCH_WINDOW and (item := next(queue, None)):
+                    filename, path, member, size = item
+                    if size > FORENSIC_MAX_IMAGE_BYTES:
+                        errors += 1
+                        yield json.dumps({
+                            "filename": filename, "analysis_type": "ELA", "status": "error",
+                            "message": f"Image of {size} bytes exceeds the {FORENSIC_MAX_IMAGE_BYTES}-byte limit"
+                        }, ensure_ascii=False) + "\n"
+                        continue
+                    try:
+                        image_ref = await asyncio.to_thread(_staged_image_to_object_store, path, member, size)
+                    except Exception as e:
+                        errors += 1
+                        yield json.dumps({"filename": filename, "analysis_type": "ELA", "status": "error",
+                                          "message": f"Unreadable upload: {e}"}, ensure_ascii=False) + "\n"
+                        continue
+                    index, actor = pool.acquire()
+                    pending[actor.run_ela_analysis.remote(image_ref)] = (filename, index, actor)
+                    del image_ref # the running call keeps the object alive until it finishes
+                if not pending:
+                    break
+
+                ready, _ = await asyncio.to_thread(ray.wait, list(pending), num_returns=1)
+                for result_ref in ready:
+                    filename, index, actor = pending.pop(result_ref)
+                    try:
+                        result = await result_ref
+                        pool.release(index)
+                    except RayActorError as e:
+                        pool.release(index, dead_actor=actor)
+                        result = {"analysis_type": "ELA", "status": "error", "message": f"Actor failure: {str(e)}"}
+                    except Exception as e:
+                        pool.release(index)
+                        result = {"analysis_type": "ELA", "status": "error", "message": str(e)}
+
+                    if result.get("status") == "completed":
+                        completed += 1
+                        if result["tamper_score"] >= FORENSIC_FLAG_THRESHOLD:
+                            flagged.append({"filename": filename, "tamper_score": result["tamper_score"]})
+                    else:
+                        errors += 1
+                    yield json.dumps({"filename": filename, **result}, ensure_ascii=False) + "\n"
+        finally:
+            # Client went away mid-batch: stop the abandoned analyses, then hand their leases back
+            for result_ref, (_, index, _) in pending.items():
+                ray.cancel(result_ref)
+                pool.release(index)
+            scratch.cleanup()
+
+        yield json.dumps({
+            "status": "batch_completed",
+            "images": len(images),
+            "completed": completed,
+            "errors": errors,
+            "flagged": sorted(flagged, key=lambda item: item["tamper_score"], reverse=True)
+        }, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
 # --- Legacy System Command Request ---
 class SystemCommandRequest(BaseModel):
     command: str
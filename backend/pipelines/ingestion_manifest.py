@@ -0,0 +1,65 @@
+# backend/pipelines/ingestion_manifest.py
+# Persistent record of which MinIO objects (and which versions of them) have been ingested.
+
+import os
+import time
+import sqlite3
+from typing import Dict, List, Tuple
+
+INGEST_MANIFEST_PATH = os.getenv(
+    "INGEST_MANIFEST_PATH", os.path.expanduser("~/.cache/raidan/ingestion_manifest.sqlite3")
+)
+
+class IngestionManifest:
+    """SQLite manifest keyed by object name, remembering the ETag/version last ingested."""
+
+    def __init__(self, path: str = INGEST_MANIFEST_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingested_objects (
+                object_name TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                ingested_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    @staticmethod
+    def fingerprint(etag: str, version_id: str = None) -> str:
+        # Listings and notifications differ in ETag quoting and in "null" for unversioned objects
+        version_id = "" if version_id in (None, "null") else version_id
+        return f"{(etag or '').strip(chr(34))}:{version_id}"
+
+    def fingerprint_of(self, object_name: str) -> str:
+        """Fingerprint last ingested for one object, or None."""
+        row = self._db.execute(
+            "SELECT fingerprint FROM ingested_objects WHERE object_name = ?", (object_name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def diff(self, listing: Dict[str, str]) -> Tuple[List[str], List[str]]:
+        """Compares {object_name: fingerprint} from the bucket with the manifest.
+
+        Returns (new or changed objects to ingest, manifest objects gone from the bucket).
+        """
+        known = dict(self._db.execute("SELECT object_name, fingerprint FROM ingested_objects"))
+        changed = [name for name, fingerprint in listing.items() if known.get(name) != fingerprint]
+        deleted = [name for name in known if name not in listing]
+        return changed, deleted
+
+    def mark_ingested(self, object_name: str, fingerprint: str):
+        self._db.execute(
+            "INSERT OR REPLACE INTO ingested_objects (object_name, fingerprint, ingested_at) VALUES (?, ?, ?)",
+            (object_name, fingerprint, time.time())
+        )
+        self._db.commit()
+
+    def forget(self, object_name: str):
+        self._db.execute("DELETE FROM ingested_objects WHERE object_name = ?", (object_name,))
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
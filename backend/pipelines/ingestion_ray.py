@@ -3,97 +3,410 @@
 # Author: Lead AI Architect, RaidanPro OS (v4.5)
 
 import os
+import sys
+import uuid
+import shutil
+import json
+import random
+import tempfile
+from collections import Counter, defaultdict
 import ray
 from minio import Minio
 from unstructured.partition.pdf import partition_pdf
 from neo4j import GraphDatabase
 from qdrant_client import QdrantClient, models
 from ollama import Client as OllamaClient
-from typing import List, Dict
+from typing import Callable, List, Dict
+from pydantic import BaseModel, ValidationError, field_validator
+from backend.embedding_cache import EmbeddingCache
+from backend.chunking import iter_chunks
+from backend.pipelines.ingestion_manifest import IngestionManifest
 
 # --- Configuration (assumes running within Docker network) ---
 MINIO_ENDPOINT = "minio:9000"
 MINIO_ACCESS_KEY = "raidan_root"
 MINIO_SECRET_KEY = "sovereign_password"
 MINIO_BUCKET = "documents" # Bucket for PDFs
+PDF_SCRATCH_DIR = os.getenv("PDF_SCRATCH_DIR") or None # None -> system temp dir
+PDF_STREAM_CHUNK_BYTES = 1024 * 1024
 
 NEO4J_URI = "bolt://neo4j:7687"
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "sovereign_password"
+NEO4J_BATCH_SIZE = int(os.getenv("NEO4J_BATCH_SIZE", "1000"))
+ENTITY_LABELS = ("Person", "Organization", "Location", "Entity")
+
+RELATION_TYPES = ("FAMILY", "WORKS_FOR", "LOCATED_IN")
+COOCCURRENCE_TYPE = "CO_OCCURS_WITH"
+EXTRACT_CHUNK_CHARS = int(os.getenv("EXTRACT_CHUNK_CHARS", "4000"))
+# Co-occurrence is quadratic in entities per document; cap it
+COOCCURRENCE_MAX_ENTITIES = int(os.getenv("COOCCURRENCE_MAX_ENTITIES", "100"))
+
+# Provenance: (:Document {name})-[m:MENTIONS]->(entity). m.cooccurs marks entities inside the document's
+# co-occurrence cap and m.stated lists "TYPE:target" for relations the document stated from that entity,
+# so a document knows exactly which edges it contributed. Edges only keep r.weight, the number of
+# documents behind them. Every lookup starts from the Document's unique-name index and only walks
+# that document's neighbourhood. Edges first, then mentions, then orphaned nodes.
+DELETE_DOCUMENT_CYPHER = (
+    f"""
+    MATCH (d:Document {{name: $doc}})-[:MENTIONS {{cooccurs: true}}]->(a)-[r:{COOCCURRENCE_TYPE}]->(b)
+          <-[:MENTIONS {{cooccurs: true}}]-(d)
+    SET r.weight = r.weight - 1
+    WITH r WHERE r.weight <= 0
+    DELETE r
+    """,
+    """
+    MATCH (d:Document {name: $doc})-[m:MENTIONS]->(a)
+    UNWIND coalesce(m.stated, []) AS stated
+    WITH d, a, split(stated, ":")[0] AS rel_type, stated
+    MATCH (a)-[r]->(b)<-[:MENTIONS]-(d)
+    WHERE type(r) = rel_type AND b.name = substring(stated, size(rel_type) + 1)
+    SET r.weight = r.weight - 1
+    WITH r WHERE r.weight <= 0
+    DELETE r
+    """,
+    """
+    MATCH (d:Document {name: $doc})-[m:MENTIONS]->(n)
+    DELETE m
+    WITH DISTINCT n WHERE NOT (n)<-[:MENTIONS]-(:Document)
+    DETACH DELETE n
+    """,
+    """
+    MATCH (d:Document {name: $doc})
+    DETACH DELETE d
+    """,
+)
 
 QDRANT_HOST = "qdrant"
 QDRANT_PORT = 6333
 QDRANT_COLLECTION = "raidan_docs"
 
+RAY_ADDRESS = os.getenv("RAY_ADDRESS", "ray://ray-head:10001")
+
 OLLAMA_HOST_FOR_RAY = "ollama:11434" # Docker service name
+OLLAMA_EMBED_MODEL = "nomic-embed-text"
+
+# --- Parallelism (replicas per stage, documents allowed in the cluster at once) ---
+PIPELINE_PDF_WORKERS = int(os.getenv("PIPELINE_PDF_WORKERS", "4"))
+PIPELINE_EXTRACT_WORKERS = int(os.getenv("PIPELINE_EXTRACT_WORKERS", "2"))
+PIPELINE_NEO4J_WORKERS = int(os.getenv("PIPELINE_NEO4J_WORKERS", "1"))
+PIPELINE_QDRANT_WORKERS = int(os.getenv("PIPELINE_QDRANT_WORKERS", "2"))
+PIPELINE_MAX_IN_FLIGHT = int(os.getenv("PIPELINE_MAX_IN_FLIGHT", "16"))
 
 # --- Ray Actors for Parallelism ---
 
 @ray.remote
 class PDFProcessor:
-    """Actor to extract text from a single PDF file."""
-    def process(self, minio_client: Minio, object_name: str) -> str:
+    """Actor to extract a single PDF file into semantic, token-bounded chunks."""
+    def __init__(self):
+        self.minio = Minio(MINIO_ENDPOINT, access_key=MINIO_ACCESS_KEY, secret_key=MINIO_SECRET_KEY, secure=False)
+        # Private scratch space per replica: concurrent processors never share filenames
+        self.scratch_dir = tempfile.mkdtemp(prefix="raidan-pdf-", dir=PDF_SCRATCH_DIR)
+
+    def process(self, object_name: str) -> List[Dict]:
+        response = None
         try:
-            response = minio_client.get_object(MINIO_BUCKET, object_name)
-            with open(object_name, "wb") as file_data:
-                file_data.write(response.read())
-            
-            elements = partition_pdf(filename=object_name)
-            text = "\n\n".join([str(el) for el in elements])
-            os.remove(object_name) # Clean up temp file
-            print(f"   [Ray-PDF] Processed {object_name}")
-            return text
+            response = self.minio.get_object(MINIO_BUCKET, object_name)
+            with tempfile.NamedTemporaryFile(dir=self.scratch_dir, suffix=".pdf") as pdf_file:
+                # Bounded memory: copy the object in fixed-size chunks
+                for chunk in response.stream(PDF_STREAM_CHUNK_BYTES):
+                    pdf_file.write(chunk)
+                pdf_file.flush()
+
+                elements = partition_pdf(filename=pdf_file.name)
+            # A PDF without text yields no chunks; that is the only case that returns []
+            chunks = [chunk.to_dict() for chunk in iter_chunks(elements)]
+            print(f"   [Ray-PDF] Processed {object_name} into {len(chunks)} chunks")
+            return chunks
         except Exception as e:
+            # Fail the ref so the document is retried instead of marked ingested with nothing in it
             print(f"   [Ray-PDF] Error processing {object_name}: {e}")
-            return ""
+            raise
+        finally:
+            if response is not None:
+                response.close()
+                response.release_conn()
+
+    def close(self):
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+# --- Extraction Records ---
+
+def _clean_name(value: str) -> str:
+    value = " ".join(str(value).split()).strip(" .,;:\"'")
+    if not value:
+        raise ValueError("empty entity name")
+    return value
+
+def _known_label(value: str) -> str:
+    value = str(value or "").strip().capitalize()
+    return value if value in ENTITY_LABELS else "Entity"
+
+class ExtractedEntity(BaseModel):
+    name: str
+    type: str = "Entity"
+    mentions: int = 1
+
+    @field_validator("name")
+    @classmethod
+    def _name(cls, value: str) -> str:
+        return _clean_name(value)
+
+    @field_validator("type")
+    @classmethod
+    def _type(cls, value: str) -> str:
+        return _known_label(value)
+
+class ExtractedRelation(BaseModel):
+    source: str
+    source_type: str = "Entity"
+    type: str
+    target: str
+    target_type: str = "Entity"
+
+    @field_validator("source", "target")
+    @classmethod
+    def _endpoint(cls, value: str) -> str:
+        return _clean_name(value)
+
+    @field_validator("source_type", "target_type")
+    @classmethod
+    def _endpoint_type(cls, value: str) -> str:
+        return _known_label(value)
+
+    @field_validator("type")
+    @classmethod
+    def _relation_type(cls, value: str) -> str:
+        value = str(value or "").strip().upper().replace(" ", "_")
+        if value not in RELATION_TYPES:
+            raise ValueError(f"unsupported relation type {value!r}")
+        return value
+
+class Extraction(BaseModel):
+    entities: List[ExtractedEntity] = []
+    relations: List[ExtractedRelation] = []
+
+    @classmethod
+    def from_llm(cls, content: str) -> "Extraction":
+        """Parses model output, keeping every item that validates and dropping the rest."""
+        data = json.loads(content)
+        if isinstance(data, list):
+            data = {"entities": data}
+        if not isinstance(data, dict):
+            return cls()
+
+        def valid(model, items):
+            for item in items if isinstance(items, list) else []:
+                try:
+                    yield model.model_validate(item)
+                except (ValidationError, TypeError):
+                    continue
+        return cls(
+            entities=list(valid(ExtractedEntity, data.get("entities"))),
+            relations=list(valid(ExtractedRelation, data.get("relations")))
+        )
+
+def merge_extractions(extractions: List[Dict]) -> Dict[str, List[Dict]]:
+    """Deduplicates entities/relations found in several chunks of one document.
+
+    Names are matched case-insensitively; the first spelling wins, the most frequent
+    type wins, and entities come back ordered by how many chunks mention them.
+    """
+    canonical, types, mentions = {}, defaultdict(Counter), Counter()
+    for extraction in extractions:
+        for entity in extraction["entities"]:
+            key = entity["name"].casefold()
+            canonical.setdefault(key, entity["name"])
+            types[key][entity["type"]] += entity["mentions"]
+            mentions[key] += entity["mentions"]
+
+    relations = {}
+    for extraction in extractions:
+        for relation in extraction["relations"]:
+            source_key, target_key = relation["source"].casefold(), relation["target"].casefold()
+            source = canonical.setdefault(source_key, relation["source"])
+            target = canonical.setdefault(target_key, relation["target"])
+            relations.setdefault((source, relation["type"], target), {
+                **relation,
+                "source": source,
+                "source_type": types[source_key].most_common(1)[0][0] if types[source_key] else relation["source_type"],
+                "target": target,
+                "target_type": types[target_key].most_common(1)[0][0] if types[target_key] else relation["target_type"],
+            })
+
+    entities = [
+        ExtractedEntity(name=canonical[key], type=types[key].most_common(1)[0][0], mentions=count).model_dump()
+        for key, count in mentions.most_common()
+    ]
+    return {"entities": entities, "relations": list(relations.values())}
+
+def _extraction_windows(chunks: List[Dict], max_chars: int = EXTRACT_CHUNK_CHARS) -> List[str]:
+    """Packs consecutive chunks (minus their overlap) into LLM prompts of at most `max_chars`."""
+    windows, current = [], ""
+    for chunk in chunks:
+        text = chunk["text"][chunk["overlap_chars"]:]
+        if current and len(current) + len(text) + 1 > max_chars:
+            windows.append(current)
+            current = ""
+        current = f"{current} {text}" if current else text
+    if current:
+        windows.append(current)
+    return windows
 
 @ray.remote
 class EntityExtractor:
-    """Actor to extract entities from text using Ollama."""
+    """Actor to extract entities and the relationships between them from text using Ollama."""
     def __init__(self):
         # Each actor gets its own Ollama client
         self.ollama = OllamaClient(host=OLLAMA_HOST_FOR_RAY)
     
-    def extract(self, text: str) -> List[Dict]:
+    def extract_chunk(self, text: str) -> Dict[str, List[Dict]]:
         if not text:
-            return []
+            return Extraction().model_dump()
         
         prompt = f"""
-        Extract named entities (Person, Organization, Location) from the following text.
-        Output a JSON array of objects, each with "name" and "type" keys.
-        Text: "{text[:2000]}"
+        Extract named entities (Person, Organization, Location) from the following text,
+        and the relationships stated between them ({", ".join(RELATION_TYPES)}).
+        Output a JSON object with two keys:
+        "entities": an array of objects with "name" and "type" keys,
+        "relations": an array of objects with "source", "source_type", "type", "target" and "target_type" keys.
+        Text: "{text}"
         """
+        # Ollama/transport errors propagate so the document fails and is retried, not ingested empty
+        response = self.ollama.chat(
+            model='qwen2.5-sovereign',
+            messages=[{'role': 'user', 'content': prompt}],
+            format='json'
+        )
         try:
-            response = self.ollama.chat(
-                model='qwen2.5-sovereign',
-                messages=[{'role': 'user', 'content': prompt}],
-                format='json'
-            )
-            entities = response['message']['content']
-            print(f"   [Ray-Entity] Extracted {len(entities)} entities.")
-            return entities
-        except Exception as e:
-            print(f"   [Ray-Entity] Error during extraction: {e}")
-            return []
+            return Extraction.from_llm(response['message']['content']).model_dump()
+        except (json.JSONDecodeError, ValidationError) as e:
+            print(f"   [Ray-Entity] Unparseable extraction output: {e}")
+            return Extraction().model_dump()
+
+@ray.remote
+def extract_document(doc_chunks: List[Dict], extractors: List) -> Dict[str, List[Dict]]:
+    """Fans a document's chunks out across all extractor replicas and merges the results."""
+    if not doc_chunks:
+        return Extraction().model_dump()
+    chunks = _extraction_windows(doc_chunks)
+    # Random start so concurrent documents do not all queue on replica 0
+    offset = random.randrange(len(extractors))
+    refs = [
+        extractors[(offset + i) % len(extractors)].extract_chunk.remote(chunk)
+        for i, chunk in enumerate(chunks)
+    ]
+    extraction = merge_extractions(ray.get(refs))
+    print(f"   [Ray-Entity] Extracted {len(extraction['entities'])} entities, "
+          f"{len(extraction['relations'])} relations from {len(chunks)} chunks.")
+    return extraction
 
 @ray.remote
 class Neo4jIngestor:
-    """Actor to ingest entities into the Neo4j graph database."""
+    """Actor to ingest entities and relationships into the Neo4j graph database."""
     def __init__(self):
         self.driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+        self.ensure_schema()
 
-    def ingest(self, entities: List[Dict]):
-        if not entities:
-            return
-            
+    def ensure_schema(self):
+        """Uniqueness on `name` per label, so every MERGE is an index seek instead of a label scan."""
         with self.driver.session() as session:
-            for entity in entities:
-                # Use MERGE to avoid duplicate nodes
+            for label in (*ENTITY_LABELS, "Document"):
                 session.run(
-                    f"MERGE (n:{entity['type']} {{name: $name}})",
-                    name=entity['name']
+                    f"CREATE CONSTRAINT {label.lower()}_name IF NOT EXISTS "
+                    f"FOR (n:{label}) REQUIRE n.name IS UNIQUE"
+                )
+
+    @staticmethod
+    def _label(entity_type: str) -> str:
+        # Labels cannot be query parameters; only whitelisted ones are interpolated
+        label = str(entity_type or "").strip().capitalize()
+        return label if label in ENTITY_LABELS else "Entity"
+
+    def ingest(self, extraction: Dict[str, List[Dict]], doc_name: str):
+        extraction = extraction or {}
+        labels = {} # name -> label
+        for entity in extraction.get("entities", []):
+            if entity.get('name'):
+                labels.setdefault(entity['name'], self._label(entity.get('type')))
+
+        # Stated relationships; endpoints the model did not list as entities become nodes too
+        edges = defaultdict(dict) # (source label, type, target label) -> {(source, target): row}
+        for relation in extraction.get("relations", []):
+            rel_type = str(relation.get('type') or "").strip().upper().replace(" ", "_")
+            source, target = relation.get('source'), relation.get('target')
+            if rel_type not in RELATION_TYPES or not source or not target or source == target:
+                continue
+            labels.setdefault(source, self._label(relation.get('source_type')))
+            labels.setdefault(target, self._label(relation.get('target_type')))
+            edges[(labels[source], rel_type, labels[target])][(source, target)] = {"source": source, "target": target}
+
+        stated = defaultdict(list) # source -> ["TYPE:target"], recorded on the document's MENTIONS
+        for (_, rel_type, _), rows in edges.items():
+            for source, target in rows:
+                stated[source].append(f"{rel_type}:{target}")
+
+        # Document co-occurrence: every pair of entities mentioned together, undirected (lower name first)
+        mentioned = list(labels)[:COOCCURRENCE_MAX_ENTITIES]
+        for i, first in enumerate(mentioned):
+            for second in mentioned[i + 1:]:
+                source, target = sorted((first, second))
+                edges[(labels[source], COOCCURRENCE_TYPE, labels[target])][(source, target)] = {
+                    "source": source, "target": target
+                }
+
+        cooccurs = set(mentioned)
+        nodes = defaultdict(list)
+        for name, label in labels.items():
+            nodes[label].append({"name": name, "cooccurs": name in cooccurs, "stated": stated.get(name, [])})
+
+        with self.driver.session() as session:
+            session.execute_write(self._replace_document, doc_name, nodes, edges)
+        print(f"   [Ray-Neo4j] Ingested {len(labels)} entities, "
+              f"{sum(map(len, edges.values()))} relationships for {doc_name}.")
+
+    @staticmethod
+    def _replace_document(tx, doc_name: str, nodes: Dict[str, List[Dict]], edges: Dict[tuple, Dict]):
+        # Re-ingesting a changed document replaces what it contributed before
+        for statement in DELETE_DOCUMENT_CYPHER:
+            tx.run(statement, doc=doc_name)
+
+        # MENTIONS records node and edge provenance for deletes; r.weight counts the documents behind an edge
+        tx.run("MERGE (:Document {name: $doc})", doc=doc_name)
+        for label, rows in nodes.items():
+            for i in range(0, len(rows), NEO4J_BATCH_SIZE):
+                tx.run(
+                    f"""
+                    MATCH (d:Document {{name: $doc}})
+                    UNWIND $rows AS row
+                    MERGE (n:{label} {{name: row.name}})
+                    MERGE (d)-[m:MENTIONS]->(n)
+                    SET m.cooccurs = row.cooccurs, m.stated = row.stated
+                    """,
+                    rows=rows[i:i + NEO4J_BATCH_SIZE], doc=doc_name
+                )
+        for (source_label, rel_type, target_label), rows in edges.items():
+            rows = list(rows.values())
+            for i in range(0, len(rows), NEO4J_BATCH_SIZE):
+                tx.run(
+                    f"""
+                    UNWIND $rows AS row
+                    MATCH (a:{source_label} {{name: row.source}})
+                    MATCH (b:{target_label} {{name: row.target}})
+                    MERGE (a)-[r:{rel_type}]->(b)
+                    ON CREATE SET r.weight = 1
+                    ON MATCH SET r.weight = r.weight + 1
+                    """,
+                    rows=rows[i:i + NEO4J_BATCH_SIZE]
                 )
-        print(f"   [Ray-Neo4j] Ingested {len(entities)} entities.")
+
+    def delete_document(self, doc_name: str):
+        """Drops a document's mentions and edge provenance and removes what no other document supports."""
+        def run(tx):
+            for statement in DELETE_DOCUMENT_CYPHER:
+                tx.run(statement, doc=doc_name).consume()
+        with self.driver.session() as session:
+            session.execute_write(run)
         
     def close(self):
         self.driver.close()
@@ -104,6 +417,7 @@ class QdrantIngestor:
     def __init__(self):
         self.qdrant = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
         self.ollama_embed = OllamaClient(host=OLLAMA_HOST_FOR_RAY)
+        self.embedding_cache = EmbeddingCache()
         
         # Ensure collection exists
         try:
@@ -113,86 +427,226 @@ class QdrantIngestor:
                 collection_name=QDRANT_COLLECTION,
                 vectors_config=models.VectorParams(size=1024, distance=models.Distance.COSINE), # nomic-embed-text size
             )
+        # Per-document deletes filter on doc_name; without a payload index each one scans the collection
+        self.qdrant.create_payload_index(
+            collection_name=QDRANT_COLLECTION,
+            field_name="doc_name",
+            field_schema=models.PayloadSchemaType.KEYWORD
+        )
 
-    def ingest(self, doc_text: str, doc_name: str):
-        if not doc_text:
+    def ingest(self, doc_chunks: List[Dict], doc_name: str):
+        if not doc_chunks:
             return
             
-        # Simple chunking for demonstration
-        chunks = [doc_text[i:i + 1000] for i in range(0, len(doc_text), 1000)]
+        chunks = [chunk["text"] for chunk in doc_chunks]
         
-        embeddings = self.ollama_embed.embed(
-            model='nomic-embed-text',
-            prompts=chunks
+        # Only chunks never seen before (by model + content hash) reach Ollama
+        embeddings = self.embedding_cache.embed(
+            OLLAMA_EMBED_MODEL,
+            chunks,
+            lambda misses: self.ollama_embed.embed(model=OLLAMA_EMBED_MODEL, input=misses)['embeddings']
         )
         
+        # Chunk counts change between versions, so stale points are dropped first
+        self.delete_document(doc_name)
         self.qdrant.upsert(
             collection_name=QDRANT_COLLECTION,
             points=[
                 models.PointStruct(
-                    id=f"{doc_name}_{i}",
-                    vector=embedding,
-                    payload={"doc_name": doc_name, "content": chunk},
+                    id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{doc_name}#{i}")),
+                    vector=embedding.tolist(),
+                    payload={"doc_name": doc_name, "content": chunk["text"], "ordinal": chunk["ordinal"]},
                 )
-                for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+                for i, (chunk, embedding) in enumerate(zip(doc_chunks, embeddings))
             ]
         )
         print(f"   [Ray-Qdrant] Ingested {len(chunks)} chunks for {doc_name}.")
 
-# --- Main Orchestration Script ---
-def run_ingestion_pipeline():
-    """Finds all PDFs in MinIO and processes them in parallel using Ray."""
-    print("🚀 [Ray Pipeline] Starting parallel ingestion...")
-    
-    # Initialize Ray cluster connection
-    ray.init(address="ray://ray-head:10001", ignore_reinit_error=True)
+    def delete_document(self, doc_name: str):
+        self.qdrant.delete(
+            collection_name=QDRANT_COLLECTION,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(
+                    must=[models.FieldCondition(key="doc_name", match=models.MatchValue(value=doc_name))]
+                )
+            )
+        )
 
-    # Initialize MinIO client
-    minio_client = Minio(
+# --- Stage Pools ---
+
+class StagePool:
+    """Replicas of one pipeline stage with least-loaded dispatch (ActorPool-style).
+
+    Unlike ray.util.ActorPool it hands out actor handles, so stages can be chained
+    by passing ObjectRefs without a round trip through the driver.
+    """
+    def __init__(self, actor_cls, size: int):
+        self.actors = [actor_cls.remote() for _ in range(max(1, size))]
+        self.in_flight = [0] * len(self.actors)
+
+    def acquire(self):
+        index = min(range(len(self.actors)), key=self.in_flight.__getitem__)
+        self.in_flight[index] += 1
+        return index, self.actors[index]
+
+    def release(self, index: int):
+        self.in_flight[index] -= 1
+
+    def broadcast(self, method: str, *args):
+        return [getattr(actor, method).remote(*args) for actor in self.actors]
+
+def _submit_document(pools: Dict[str, StagePool], pdf_file: str):
+    """Chains the stages for one PDF; returns its terminal refs and the leases it holds."""
+    # Extraction is spread chunk by chunk over the whole extractor pool, so it takes no lease
+    leases = {stage: pools[stage].acquire() for stage in ("pdf", "neo4j", "qdrant")}
+    actors = {stage: actor for stage, (_, actor) in leases.items()}
+
+    chunks_ref = actors["pdf"].process.remote(pdf_file)
+    entities_ref = extract_document.remote(chunks_ref, pools["extract"].actors)
+    refs = [
+        actors["neo4j"].ingest.remote(entities_ref, pdf_file),
+        actors["qdrant"].ingest.remote(chunks_ref, pdf_file),
+    ]
+    return refs, leases
+
+def run_documents(pools: Dict[str, StagePool], pdf_files: List[str], max_in_flight: int = PIPELINE_MAX_IN_FLIGHT,
+                  on_done: Callable[[str], None] = None, on_failed: Callable[[str, str], None] = None):
+    """Streams documents through the stage pools with at most `max_in_flight` documents in the cluster.
+
+    `on_done` is called with each document whose stages all succeeded, `on_failed`
+    with each document that failed and the first error it raised.
+    """
+    queue = iter(pdf_files)
+    pending = {} # terminal ref -> document
+    documents = {} # document -> {"refs": outstanding terminal refs, "leases": stage leases}
+    done, failed = 0, 0
+
+    while True:
+        while len(documents) < max_in_flight and (pdf_file := next(queue, None)):
+            refs, leases = _submit_document(pools, pdf_file)
+            documents[pdf_file] = {"refs": set(refs), "leases": leases, "error": None}
+            pending.update({ref: pdf_file for ref in refs})
+        if not pending:
+            break
+
+        ready, _ = ray.wait(list(pending), num_returns=1)
+        for ref in ready:
+            pdf_file = pending.pop(ref)
+            doc = documents[pdf_file]
+            try:
+                ray.get(ref)
+            except Exception as e:
+                doc["error"] = doc["error"] or str(e)
+                print(f"   [Ray Pipeline] {pdf_file} failed: {e}")
+            doc["refs"].discard(ref)
+            if not doc["refs"]:
+                # Document fully ingested: its intermediate objects can be freed
+                for stage, (index, _) in doc["leases"].items():
+                    pools[stage].release(index)
+                del documents[pdf_file]
+                if doc["error"] is None:
+                    done += 1
+                    if on_done:
+                        on_done(pdf_file)
+                else:
+                    failed += 1
+                    if on_failed:
+                        on_failed(pdf_file, doc["error"])
+                if (done + failed) % 100 == 0:
+                    print(f"   [Ray Pipeline] {done + failed}/{len(pdf_files)} documents processed.")
+    return done, failed
+
+def delete_documents(pools: Dict[str, StagePool], object_names: List[str]):
+    """Propagates objects removed from MinIO to Qdrant and Neo4j."""
+    qdrant, neo4j = pools["qdrant"].actors[0], pools["neo4j"].actors[0]
+    ray.get([
+        ref for name in object_names
+        for ref in (qdrant.delete_document.remote(name), neo4j.delete_document.remote(name))
+    ])
+
+def create_stage_pools() -> Dict[str, StagePool]:
+    return {
+        "pdf": StagePool(PDFProcessor, PIPELINE_PDF_WORKERS),
+        "extract": StagePool(EntityExtractor, PIPELINE_EXTRACT_WORKERS),
+        "neo4j": StagePool(Neo4jIngestor, PIPELINE_NEO4J_WORKERS),
+        "qdrant": StagePool(QdrantIngestor, PIPELINE_QDRANT_WORKERS),
+    }
+
+def close_stage_pools(pools: Dict[str, StagePool]):
+    # Clean up Neo4j connections and PDF scratch space
+    ray.get(pools["neo4j"].broadcast("close") + pools["pdf"].broadcast("close"))
+
+def create_minio_client() -> Minio:
+    return Minio(
         MINIO_ENDPOINT,
         access_key=MINIO_ACCESS_KEY,
         secret_key=MINIO_SECRET_KEY,
         secure=False
     )
+
+def list_pdf_objects(minio_client: Minio) -> Dict[str, str]:
+    """{object_name: manifest fingerprint} for every PDF in the bucket.
+
+    Lists versions so fingerprints match the ones built from bucket notifications; only the
+    latest version of each object counts, and objects whose latest version is a delete marker are gone.
+    """
+    objects = minio_client.list_objects(MINIO_BUCKET, recursive=True, include_version=True)
+    return {
+        obj.object_name: IngestionManifest.fingerprint(obj.etag, obj.version_id)
+        for obj in objects
+        if obj.object_name.lower().endswith('.pdf')
+        and str(obj.is_latest).lower() == "true" and not obj.is_delete_marker
+    }
+
+# --- Main Orchestration Script ---
+def run_ingestion_pipeline(full: bool = False):
+    """Processes new or changed PDFs in MinIO in parallel using Ray.
+
+    The ingestion manifest skips objects whose ETag/version was already ingested
+    and propagates deletes; `full=True` reprocesses the whole bucket.
+    """
+    print("🚀 [Ray Pipeline] Starting parallel ingestion...")
+    
+    # Initialize Ray cluster connection
+    ray.init(address=RAY_ADDRESS, ignore_reinit_error=True)
+
+    # Initialize MinIO client
+    minio_client = create_minio_client()
+    manifest = IngestionManifest()
     
-    # List all PDF objects in the bucket
+    # List all PDF objects in the bucket with their content fingerprint
     try:
-        objects = minio_client.list_objects(MINIO_BUCKET, recursive=True)
-        pdf_files = [obj.object_name for obj in objects if obj.object_name.lower().endswith('.pdf')]
+        listing = list_pdf_objects(minio_client)
     except Exception as e:
         print(f"❌ Could not connect to MinIO or list objects: {e}")
         return
 
-    if not pdf_files:
-        print("ℹ️  No PDFs found in MinIO bucket '{MINIO_BUCKET}'.")
+    pdf_files, deleted = manifest.diff(listing)
+    if full:
+        pdf_files = list(listing)
+
+    if not pdf_files and not deleted:
+        print(f"ℹ️  No new, changed or deleted PDFs in MinIO bucket '{MINIO_BUCKET}'.")
         return
         
-    print(f"Found {len(pdf_files)} PDFs to process.")
-
-    # Create actor pool
-    pdf_processor = PDFProcessor.remote()
-    entity_extractor = EntityExtractor.remote()
-    neo4j_ingestor = Neo4jIngestor.remote()
-    qdrant_ingestor = QdrantIngestor.remote()
-
-    # Create and execute the workflow for each file
-    tasks = []
-    for pdf_file in pdf_files:
-        # Chain the operations for each file
-        text_ref = pdf_processor.process.remote(minio_client, pdf_file)
-        
-        entities_ref = entity_extractor.extract.remote(text_ref)
-        tasks.append(neo4j_ingestor.ingest.remote(entities_ref))
-        
-        tasks.append(qdrant_ingestor.ingest.remote(text_ref, pdf_file))
+    print(f"Found {len(pdf_files)} PDFs to process and {len(deleted)} to delete ({len(listing)} in bucket).")
+
+    # Create per-stage actor pools
+    pools = create_stage_pools()
 
-    # Wait for all tasks to complete
-    ray.get(tasks)
+    if deleted:
+        delete_documents(pools, deleted)
+        for name in deleted:
+            manifest.forget(name)
+
+    done, failed = run_documents(
+        pools, pdf_files, on_done=lambda name: manifest.mark_ingested(name, listing[name])
+    )
 
-    print("✅ [Ray Pipeline] All ingestion tasks completed.")
+    print(f"✅ [Ray Pipeline] All ingestion tasks completed ({done} ok, {failed} failed, {len(deleted)} deleted).")
     
-    # Clean up Neo4j connection
-    neo4j_ingestor.close.remote()
+    close_stage_pools(pools)
+    manifest.close()
 
 if __name__ == "__main__":
-    run_ingestion_pipeline()
+    run_ingestion_pipeline(full="--full" in sys.argv)
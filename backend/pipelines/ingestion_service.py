@@ -0,0 +1,264 @@
+# backend/pipelines/ingestion_service.py
+# Long-running, event-driven ingestion: MinIO bucket notifications -> durable queue -> Ray pipeline.
+# Author: Lead AI Architect, RaidanPro OS (v4.5)
+
+import os
+import time
+import queue
+import sqlite3
+import threading
+from urllib.parse import unquote_plus
+from typing import Callable, Dict, Iterator, List, Tuple
+import ray
+from backend.pipelines.ingestion_manifest import IngestionManifest
+from backend.pipelines.ingestion_ray import (
+    MINIO_BUCKET, RAY_ADDRESS, create_minio_client, create_stage_pools, close_stage_pools,
+    delete_documents, list_pdf_objects, run_documents
+)
+
+# --- Configuration ---
+INGEST_QUEUE_PATH = os.getenv("INGEST_QUEUE_PATH", os.path.expanduser("~/.cache/raidan/ingestion_queue.sqlite3"))
+INGEST_SERVICE_BATCH = int(os.getenv("INGEST_SERVICE_BATCH", "32"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+INGEST_RETRY_BASE_S = float(os.getenv("INGEST_RETRY_BASE_S", "30"))
+INGEST_POLL_INTERVAL_S = 1.0
+INGEST_RECONNECT_BASE_S = 1.0
+INGEST_RECONNECT_MAX_S = 60.0
+
+# An event is (action, object_name, fingerprint) with action "put" or "delete"
+Event = Tuple[str, str, str]
+
+# --- Notification Sources ---
+
+class MinioNotificationSource:
+    """Yields PDF create/remove events from MinIO's bucket notification stream."""
+    def __init__(self, minio_client=None, bucket: str = MINIO_BUCKET):
+        self.minio = minio_client or create_minio_client()
+        self.bucket = bucket
+
+    def events(self) -> Iterator[Event]:
+        with self.minio.listen_bucket_notification(
+            self.bucket, suffix=".pdf", events=["s3:ObjectCreated:*", "s3:ObjectRemoved:*"]
+        ) as notifications:
+            for notification in notifications:
+                for record in notification.get("Records", []):
+                    obj = record["s3"]["object"]
+                    action = "delete" if record["eventName"].startswith("s3:ObjectRemoved") else "put"
+                    fingerprint = IngestionManifest.fingerprint(obj.get("eTag", ""), obj.get("versionId"))
+                    yield action, unquote_plus(obj["key"]), fingerprint
+
+    def close(self):
+        pass
+
+class LocalNotificationSource:
+    """In-process stand-in for MinIO notifications (tests, local development)."""
+    def __init__(self):
+        self._events = queue.Queue()
+
+    def publish(self, action: str, object_name: str, fingerprint: str = ""):
+        self._events.put((action, object_name, fingerprint))
+
+    def events(self) -> Iterator[Event]:
+        while (event := self._events.get()) is not None:
+            yield event
+
+    def close(self):
+        self._events.put(None)
+
+# --- Durable Queue ---
+
+class DurableQueue:
+    """SQLite-backed work queue: one pending job per object, exponential backoff on failure."""
+
+    def __init__(self, path: str = INGEST_QUEUE_PATH, max_attempts: int = INGEST_MAX_ATTEMPTS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                object_name TEXT PRIMARY KEY,
+                action TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                revision INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                last_error TEXT
+            )
+            """
+        )
+        self._db.commit()
+
+    def push(self, action: str, object_name: str, fingerprint: str):
+        """Enqueues an event; a newer event for the same object supersedes the queued one."""
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO ingestion_jobs (object_name, action, fingerprint, next_attempt_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(object_name) DO UPDATE SET
+                    action = excluded.action, fingerprint = excluded.fingerprint,
+                    revision = revision + 1, attempts = 0, status = 'pending',
+                    next_attempt_at = excluded.next_attempt_at, last_error = NULL
+                """,
+                (object_name, action, fingerprint, time.time())
+            )
+            self._db.commit()
+
+    def claim(self, limit: int) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT object_name, action, fingerprint, revision, attempts FROM ingestion_jobs
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT ?
+                """,
+                (time.time(), limit)
+            ).fetchall()
+        keys = ("object_name", "action", "fingerprint", "revision", "attempts")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def ack(self, job: Dict):
+        # Only the revision that was processed is removed; a newer event stays queued
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM ingestion_jobs WHERE object_name = ? AND revision = ?",
+                (job["object_name"], job["revision"])
+            )
+            self._db.commit()
+
+    def retry(self, job: Dict, error: str):
+        attempts = job["attempts"] + 1
+        status = "dead" if attempts >= self.max_attempts else "pending"
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE ingestion_jobs SET attempts = ?, status = ?, next_attempt_at = ?, last_error = ?
+                WHERE object_name = ? AND revision = ?
+                """,
+                (attempts, status, time.time() + INGEST_RETRY_BASE_S * 2 ** (attempts - 1), error,
+                 job["object_name"], job["revision"])
+            )
+            self._db.commit()
+        if status == "dead":
+            print(f"   [Ingest Service] Giving up on {job['object_name']} after {attempts} attempts: {error}")
+
+    def close(self):
+        self._db.close()
+
+# --- Service ---
+
+class IngestionService:
+    """Feeds notification events through the durable queue into the Ray stage pools."""
+
+    def __init__(self, source, jobs: DurableQueue = None, manifest: IngestionManifest = None, pools=None,
+                 batch_size: int = INGEST_SERVICE_BATCH, lister: Callable[[], Dict[str, str]] = None):
+        self.source = source
+        self.jobs = jobs or DurableQueue()
+        self.manifest = manifest or IngestionManifest()
+        self.pools = pools
+        self.batch_size = batch_size
+        # Bucket listing used to catch up on events missed while the notification stream was down
+        self.lister = lister
+        self._stopped = threading.Event()
+        self._needs_backfill = threading.Event()
+
+    def backfill(self, listing: Dict[str, str]):
+        """Queues whatever changed while the service was down (bucket listing vs manifest)."""
+        changed, deleted = self.manifest.diff(listing)
+        for name in changed:
+            self.jobs.push("put", name, listing[name])
+        for name in deleted:
+            self.jobs.push("delete", name, "")
+        print(f"   [Ingest Service] Backfill queued {len(changed)} changed and {len(deleted)} deleted objects.")
+
+    def _listen(self):
+        """Consumes notifications, reconnecting with backoff whenever the stream drops."""
+        delay = INGEST_RECONNECT_BASE_S
+        while not self._stopped.is_set():
+            try:
+                for action, object_name, fingerprint in self.source.events():
+                    delay = INGEST_RECONNECT_BASE_S
+                    if object_name.lower().endswith(".pdf"):
+                        self.jobs.push(action, object_name, fingerprint)
+                    if self._stopped.is_set():
+                        return
+                if self._stopped.is_set():
+                    return
+                print("   [Ingest Service] Notification stream ended; reconnecting...")
+            except Exception as e:
+                print(f"   [Ingest Service] Notification stream failed ({e}); reconnecting in {delay:.0f}s...")
+            self._stopped.wait(delay)
+            delay = min(delay * 2, INGEST_RECONNECT_MAX_S)
+            # Events may have been missed while disconnected; the main loop re-lists the bucket
+            self._needs_backfill.set()
+
+    def run_once(self) -> int:
+        """Processes one batch of due jobs; returns how many jobs were taken."""
+        jobs = self.jobs.claim(self.batch_size)
+        if not jobs:
+            return 0
+
+        deletes = [job for job in jobs if job["action"] == "delete"]
+        if deletes:
+            try:
+                delete_documents(self.pools, [job["object_name"] for job in deletes])
+                for job in deletes:
+                    self.manifest.forget(job["object_name"])
+                    self.jobs.ack(job)
+            except Exception as e:
+                for job in deletes:
+                    self.jobs.retry(job, str(e))
+
+        # Duplicate notifications for an already-ingested version are acknowledged without work
+        puts = {}
+        for job in jobs:
+            if job["action"] != "put":
+                continue
+            if self.manifest.fingerprint_of(job["object_name"]) != job["fingerprint"]:
+                puts[job["object_name"]] = job
+            else:
+                self.jobs.ack(job)
+
+        def on_done(name: str):
+            self.manifest.mark_ingested(name, puts[name]["fingerprint"])
+            self.jobs.ack(puts[name])
+
+        run_documents(self.pools, list(puts), on_done=on_done,
+                      on_failed=lambda name, error: self.jobs.retry(puts[name], error))
+        return len(jobs)
+
+    def run_forever(self):
+        if self.pools is None:
+            self.pools = create_stage_pools()
+        listener = threading.Thread(target=self._listen, name="minio-notifications", daemon=True)
+        listener.start()
+        print("🚀 [Ingest Service] Listening for bucket notifications...")
+        try:
+            while not self._stopped.is_set():
+                if self._needs_backfill.is_set() and self.lister is not None:
+                    self._needs_backfill.clear()
+                    try:
+                        self.backfill(self.lister())
+                    except Exception as e:
+                        print(f"   [Ingest Service] Backfill failed, will retry: {e}")
+                        self._needs_backfill.set()
+                        time.sleep(INGEST_RECONNECT_BASE_S)
+                if not self.run_once():
+                    time.sleep(INGEST_POLL_INTERVAL_S)
+        finally:
+            self.source.close()
+            close_stage_pools(self.pools)
+
+    def stop(self):
+        self._stopped.set()
+
+if __name__ == "__main__":
+    ray.init(address=RAY_ADDRESS, ignore_reinit_error=True)
+    minio_client = create_minio_client()
+    service = IngestionService(MinioNotificationSource(minio_client), lister=lambda: list_pdf_objects(minio_client))
+    service.backfill(list_pdf_objects(minio_client))
+    service.run_forever()
@@ -4,43 +4,188 @@
 # Purpose: Direct hardware orchestration and parallel AI inference.
 
 import os
+import io
+import time
+import base64
+import asyncio
 import ray
 import requests
 import json
+import httpx
+import numpy as np
 from typing import Dict, List, Any
-from ollama import Client as OllamaClient
+from PIL import Image
+from ollama import AsyncClient as AsyncOllamaClient
+
+# Generations one chat actor keeps in flight against Ollama (match OLLAMA_NUM_PARALLEL)
+OLLAMA_MAX_INFLIGHT = int(os.getenv("OLLAMA_MAX_INFLIGHT", "4"))
 
 @ray.remote(num_gpus=0.5 if os.getenv("HAS_GPU") == "true" else 0)
 class SovereignChatActor:
     """Manages LLM inference sessions across different models (Ollama/Gemini)."""
-    def __init__(self, host: str = "http://172.28.0.1:11434"):
-        self.client = OllamaClient(host=host)
-        print(f"   [Ray] Chat Actor Initialized on {host}")
+    def __init__(self, host: str = "http://172.28.0.1:11434", max_inflight: int = OLLAMA_MAX_INFLIGHT):
+        # One keep-alive httpx pool per actor, shared by every concurrent generation
+        self.client = AsyncOllamaClient(
+            host=host,
+            timeout=httpx.Timeout(None, connect=10.0),
+            limits=httpx.Limits(max_connections=max_inflight, max_keepalive_connections=max_inflight)
+        )
+        self.slots = asyncio.Semaphore(max_inflight)
+        print(f"   [Ray] Chat Actor Initialized on {host} ({max_inflight} parallel generations)")
 
     async def chat(self, model: str, messages: List[Dict], options: Dict = None) -> Dict:
         try:
-            response = self.client.chat(
-                model=model,
-                messages=messages,
-                options=options or {"temperature": 0.3}
-            )
+            async with self.slots:
+                response = await self.client.chat(
+                    model=model,
+                    messages=messages,
+                    options=options or {"temperature": 0.3}
+                )
             return {"status": "success", "response": response['message']['content']}
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    async def chat_stream(self, model: str, messages: List[Dict], options: Dict = None):
+        """Yields tokens as Ollama produces them. Call with `.options(num_returns="streaming")`."""
+        try:
+            async with self.slots:
+                stream = await self.client.chat(
+                    model=model,
+                    messages=messages,
+                    options=options or {"temperature": 0.3},
+                    stream=True
+                )
+                async for part in stream:
+                    token = part['message']['content']
+                    if token:
+                        yield {"status": "token", "token": token}
+                    if part.get('done'):
+                        yield {"status": "done", "eval_count": part.get('eval_count')}
+                        break
+        except Exception as e:
+            yield {"status": "error", "message": str(e)}
+
+# Chunks per /api/embed call and batches kept in flight per embedding actor
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_MAX_INFLIGHT = int(os.getenv("EMBED_MAX_INFLIGHT", "4"))
+
 @ray.remote(num_cpus=2)
 class EmbeddingActor:
     """Parallelized Vector Embedding Generator for RAG pipelines."""
-    def __init__(self, host: str = "http://172.28.0.1:11434"):
-        self.client = OllamaClient(host=host)
+    def __init__(self, host: str = "http://172.28.0.1:11434", batch_size: int = EMBED_BATCH_SIZE,
+                 max_inflight: int = EMBED_MAX_INFLIGHT):
+        self.client = AsyncOllamaClient(
+            host=host,
+            limits=httpx.Limits(max_connections=max_inflight, max_keepalive_connections=max_inflight)
+        )
+        self.batch_size = batch_size
+        self.slots = asyncio.Semaphore(max_inflight)
+
+    async def _embed_batch(self, model: str, batch: List[str]) -> List[List[float]]:
+        async with self.slots:
+            resp = await self.client.embed(model=model, input=batch)
+        return resp['embeddings']
+
+    async def generate_embeddings(self, text_chunks: List[str], model: str = "nomic-embed-text",
+                                  batch_size: int = None) -> np.ndarray:
+        """Returns a contiguous (len(text_chunks), dim) float32 matrix, one row per chunk."""
+        size = batch_size or self.batch_size
+        batches = [text_chunks[i:i + size] for i in range(0, len(text_chunks), size)]
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Batches are pipelined against Ollama; the semaphore bounds how many are in flight
+        results = await asyncio.gather(*(self._embed_batch(model, batch) for batch in batches))
+
+        matrix = np.empty((len(text_chunks), len(results[0][0])), dtype=np.float32)
+        offset = 0
+        for vectors in results:
+            matrix[offset:offset + len(vectors)] = vectors
+            offset += len(vectors)
+        return matrix
+
+# --- Error Level Analysis ---
+ELA_JPEG_QUALITY = int(os.getenv("ELA_JPEG_QUALITY", "90"))
+# Tiles are multiples of 16 px so per-tile JPEG recompression keeps the original MCU grid
+ELA_TILE_SIZE = int(os.getenv("ELA_TILE_SIZE", "1024")) // 16 * 16 or 1024
+# Images larger than this are split across Ray tasks, one per tile
+ELA_PARALLEL_PIXELS = int(os.getenv("ELA_PARALLEL_PIXELS", "16000000"))
+ELA_HEATMAP_MAX_SIDE = 1024
+ELA_BLOCK = 8 # JPEG DCT block size; error levels are reported per block
+# A block is an outlier when its error sits more than ELA_OUTLIER_Z robust deviations (MAD) above the
+# image's median block error; isolated outliers (edges, text) are ignored unless at least
+# ELA_MIN_NEIGHBOURS of the 8 surrounding blocks are outliers too, since tampering covers regions.
+# On clean single-save JPEGs the resulting tamper_score is ~0.
+ELA_OUTLIER_Z = float(os.getenv("ELA_OUTLIER_Z", "6"))
+ELA_MIN_NEIGHBOURS = int(os.getenv("ELA_MIN_NEIGHBOURS", "4"))
+ELA_MIN_SPREAD = 1.0 # floor for the MAD (grey levels), so near-flat images do not turn noise into outliers
+
+Image.MAX_IMAGE_PIXELS = int(os.getenv("FORENSIC_MAX_PIXELS", "500000000"))
+
+class SharedBufferReader(io.RawIOBase):
+    """Seekable file view over a buffer (e.g. a plasma-backed ndarray) that never copies it whole."""
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
 
-    def generate_embeddings(self, text_chunks: List[str], model: str = "nomic-embed-text") -> List[List[float]]:
-        embeddings = []
-        # Ray allows us to batch these efficiently or run them in parallel
-        for chunk in text_chunks:
-            resp = self.client.embeddings(model=model, prompt=chunk)
-            embeddings.append(resp['embedding'])
-        return embeddings
+    def readinto(self, target) -> int:
+        count = max(0, min(len(target), len(self._view) - self._pos))
+        target[:count] = self._view[self._pos:self._pos + count]
+        self._pos += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+def _ela_block_errors(tile: np.ndarray, quality: int) -> np.ndarray:
+    """Recompresses an RGB tile and returns the mean error level of each 8x8 block."""
+    buffer = io.BytesIO()
+    Image.fromarray(tile).save(buffer, "JPEG", quality=quality)
+    buffer.seek(0)
+    recompressed = np.asarray(Image.open(buffer).convert("RGB"))
+
+    # Per-pixel error level: worst channel difference
+    diff = np.abs(tile.astype(np.int16) - recompressed.astype(np.int16)).max(axis=2)
+    rows, cols = diff.shape[0] // ELA_BLOCK, diff.shape[1] // ELA_BLOCK
+    blocks = diff[:rows * ELA_BLOCK, :cols * ELA_BLOCK].reshape(rows, ELA_BLOCK, cols, ELA_BLOCK)
+    return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+@ray.remote(num_cpus=1)
+def ela_tile(pixels: np.ndarray, y0: int, y1: int, x0: int, x1: int, quality: int) -> np.ndarray:
+    """Ray task over one tile; `pixels` arrives zero-copy from the object store."""
+    return _ela_block_errors(pixels[y0:y1, x0:x1], quality)
+
+def _ela_suspicious_blocks(block_errors: np.ndarray):
+    """Returns (mask of blocks in outlier regions, median block error, robust spread)."""
+    median = float(np.median(block_errors))
+    spread = max(1.4826 * float(np.median(np.abs(block_errors - median))), ELA_MIN_SPREAD)
+    outliers = (block_errors - median) / spread > ELA_OUTLIER_Z
+    padded = np.pad(outliers, 1).astype(np.int8)
+    rows, cols = outliers.shape
+    neighbours = sum(
+        padded[1 + dy:1 + dy + rows, 1 + dx:1 + dx + cols]
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx
+    )
+    return outliers & (neighbours >= ELA_MIN_NEIGHBOURS), median, spread
+
+def _ela_heatmap_png(block_errors: np.ndarray) -> str:
+    peak = float(block_errors.max()) or 1.0
+    heatmap = Image.fromarray((block_errors * (255.0 / peak)).astype(np.uint8), mode="L")
+    heatmap.thumbnail((ELA_HEATMAP_MAX_SIDE, ELA_HEATMAP_MAX_SIDE))
+    buffer = io.BytesIO()
+    heatmap.save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
 
 @ray.remote(num_cpus=4)
 class ForensicAnalyzerActor:
@@ -48,14 +193,50 @@ class ForensicAnalyzerActor:
     def __init__(self):
         print("   [Ray] Forensic Analyzer Actor Initialized.")
 
-    def run_ela_analysis(self, image_data: bytes) -> Dict:
-        # Placeholder for complex Error Level Analysis logic
-        # In production, this calls specialized C++/Python libs
-        import time
-        time.sleep(2) # Simulate heavy compute
+    def run_ela_analysis(self, image_data, quality: int = ELA_JPEG_QUALITY) -> Dict:
+        """`image_data` is bytes or a uint8 buffer resolved from the object store; decoded in place."""
+        started = time.time()
+        try:
+            pixels = np.asarray(Image.open(SharedBufferReader(image_data)).convert("RGB"))
+        except Exception as e:
+            return {"analysis_type": "ELA", "status": "error", "message": f"Unreadable image: {str(e)}"}
+
+        height, width = pixels.shape[:2]
+        tiles = [
+            (y, min(y + ELA_TILE_SIZE, height), x, min(x + ELA_TILE_SIZE, width))
+            for y in range(0, height, ELA_TILE_SIZE)
+            for x in range(0, width, ELA_TILE_SIZE)
+        ]
+        if height * width > ELA_PARALLEL_PIXELS and len(tiles) > 1:
+            pixels_ref = ray.put(pixels)
+            tile_errors = ray.get([ela_tile.remote(pixels_ref, *tile, quality) for tile in tiles])
+        else:
+            tile_errors = [_ela_block_errors(pixels[y0:y1, x0:x1], quality) for y0, y1, x0, x1 in tiles]
+
+        # Tiles are row-major and 8-px aligned, so their block grids stitch back edge to edge
+        tiles_per_row = -(-width // ELA_TILE_SIZE)
+        block_errors = np.vstack([
+            np.hstack(tile_errors[i:i + tiles_per_row]) for i in range(0, len(tile_errors), tiles_per_row)
+        ])
+
+        if block_errors.size == 0:
+            return {"analysis_type": "ELA", "status": "error", "message": "Image smaller than one 8x8 block"}
+
+        # Share of blocks inside regions whose error level stands out from the image's own baseline
+        suspicious, median_error, spread = _ela_suspicious_blocks(block_errors)
         return {
             "analysis_type": "ELA",
-            "tamper_score": 0.12,
+            "tamper_score": round(float(suspicious.mean()), 4),
+            "mean_error": round(float(block_errors.mean()), 3),
+            "median_error": round(median_error, 3),
+            "error_spread": round(spread, 3),
+            "max_error": round(float(block_errors.max()), 3),
+            "suspicious_blocks": int(suspicious.sum()),
+            "width": width,
+            "height": height,
+            "tiles": len(tiles),
+            "heatmap_png": _ela_heatmap_png(block_errors),
             "status": "completed",
+            "elapsed_s": round(time.time() - started, 3),
             "timestamp": time.time()
         }
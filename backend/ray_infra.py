@@ -1,18 +1,95 @@
-
 # backend/ray_infra.py
 # Ray Cluster Orchestrator for RaidanPro OS
 
 import os
+import threading
+from contextlib import contextmanager
 import ray
+from ray.exceptions import RayActorError
 from backend.ray_actors import SovereignChatActor, EmbeddingActor, ForensicAnalyzerActor
 
+# --- Chat Pool Sizing ---
+# RAY_CHAT_REPLICAS pins the pool size; otherwise it is derived from the cluster
+# (GPU count / RAY_CHAT_GPU_FRACTION on GPU hosts, one replica per alive node on CPU).
+RAY_CHAT_REPLICAS = os.getenv("RAY_CHAT_REPLICAS")
+RAY_CHAT_GPU_FRACTION = float(os.getenv("RAY_CHAT_GPU_FRACTION", "0.5"))
+RAY_FORENSIC_REPLICAS = int(os.getenv("RAY_FORENSIC_REPLICAS", "2"))
+
+class ReplicaPool:
+    """Named replicas of one actor class with least-loaded routing and dead-replica respawn."""
+
+    def __init__(self, actor_cls, name_prefix: str, size: int, **actor_options):
+        self.actor_cls = actor_cls
+        self.name_prefix = name_prefix
+        self.actor_options = actor_options
+        self.replicas = [None] * max(1, size)
+        self.in_flight = [0] * len(self.replicas)
+        self.generations = [0] * len(self.replicas)
+        self._lock = threading.Lock()
+
+    def start(self):
+        for index in range(len(self.replicas)):
+            # Reuse live replicas left by an earlier API process under the same name
+            self.replicas[index] = self.actor_cls.options(
+                name=f"{self.name_prefix}_{index}", get_if_exists=True, **self.actor_options
+            ).remote()
+        return self
+
+    def respawn(self, index: int, dead_actor):
+        """Replaces `dead_actor` in its slot, unless another failed call already did.
+
+        The replacement gets a fresh name: Ray kills asynchronously, so the old name may
+        still resolve to the dying actor for a while.
+        """
+        with self._lock:
+            if self.replicas[index] is not dead_actor:
+                return
+            self.generations[index] += 1
+            name = f"{self.name_prefix}_{index}_r{self.generations[index]}"
+            self.replicas[index] = self.actor_cls.options(name=name, **self.actor_options).remote()
+        print(f"♻️  [Ray] Respawned replica {self.name_prefix}_{index} as {name}.")
+        try:
+            ray.kill(dead_actor, no_restart=True)
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Reserves the replica with the fewest in-flight calls; pair with release(index)."""
+        with self._lock:
+            index = min(range(len(self.replicas)), key=self.in_flight.__getitem__)
+            self.in_flight[index] += 1
+            return index, self.replicas[index]
+
+    def release(self, index: int, dead_actor=None):
+        """Returns a lease; pass the handle whose call failed with RayActorError as `dead_actor`."""
+        if dead_actor is not None:
+            self.respawn(index, dead_actor)
+        with self._lock:
+            self.in_flight[index] -= 1
+
+    @contextmanager
+    def lease(self):
+        """Yields the least-loaded replica for the duration of one request."""
+        index, actor = self.acquire()
+        dead_actor = None
+        try:
+            yield actor
+        except RayActorError:
+            dead_actor = actor
+            raise
+        finally:
+            self.release(index, dead_actor=dead_actor)
+
+    def stats(self) -> dict:
+        return {f"{self.name_prefix}_{i}": n for i, n in enumerate(self.in_flight)}
+
 class RayManager:
     _instance = None
     
     def __init__(self):
-        self.chat_actor = None
+        self.chat_pool = None
         self.embedding_actor = None
-        self.forensic_actor = None
+        self.forensic_pool = None
 
     @classmethod
     def get_instance(cls):
@@ -20,6 +97,13 @@ class RayManager:
             cls._instance = RayManager()
         return cls._instance
 
+    def _chat_pool_size(self) -> int:
+        if RAY_CHAT_REPLICAS:
+            return int(RAY_CHAT_REPLICAS)
+        if os.getenv("HAS_GPU") == "true":
+            return int(ray.cluster_resources().get("GPU", 0) / RAY_CHAT_GPU_FRACTION)
+        return len([node for node in ray.nodes() if node.get("Alive")])
+
     def initialize(self):
         """Connects to the Ray head node and spawns long-lived system actors."""
         ray_address = os.getenv("RAY_ADDRESS", "ray://172.28.0.43:10001")
@@ -30,22 +114,25 @@ class RayManager:
             
             # Spawn global named actors for the system
             # We use 'get_or_create' logic implicitly by storing them in the manager
-            self.chat_actor = SovereignChatActor.options(name="system_chat", get_if_exists=True).remote()
+            chat_options = {"num_gpus": RAY_CHAT_GPU_FRACTION} if os.getenv("HAS_GPU") == "true" else {}
+            self.chat_pool = ReplicaPool(
+                SovereignChatActor, "system_chat", self._chat_pool_size(), **chat_options
+            ).start()
             self.embedding_actor = EmbeddingActor.options(name="system_embed", get_if_exists=True).remote()
-            self.forensic_actor = ForensicAnalyzerActor.options(name="system_forensics", get_if_exists=True).remote()
+            self.forensic_pool = ReplicaPool(ForensicAnalyzerActor, "system_forensics", RAY_FORENSIC_REPLICAS).start()
             
-            print("✅ [Ray] System Actors Deployed & Ready.")
+            print(f"✅ [Ray] System Actors Deployed & Ready ({len(self.chat_pool.replicas)} chat replicas).")
         except Exception as e:
             print(f"❌ [Ray] Initialization Failed: {e}")
 
-    def get_chat_actor(self):
-        return self.chat_actor
+    def get_chat_pool(self):
+        return self.chat_pool
 
     def get_embed_actor(self):
         return self.embedding_actor
 
-    def get_forensics_actor(self):
-        return self.forensic_actor
+    def get_forensics_pool(self):
+        return self.forensic_pool
 
     def shutdown(self):
         ray.shutdown()
@@ -0,0 +1,126 @@
+# yemen_core_backend/columnar_export.py
+# Streams warehouse tables out as Apache Arrow IPC or Parquet, batch by batch from a server-side cursor.
+
+import io
+import os
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "50000"))
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+_TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+@dataclass(frozen=True)
+class ExportSpec:
+    schema: pa.Schema
+    time_column: str # used for start/end filters and row order
+    filters: frozenset # columns that accept an equality filter
+
+EXPORT_TABLES: Dict[str, ExportSpec] = {
+    "yemen_stats": ExportSpec(
+        schema=pa.schema([
+            ("id", pa.int64()), ("category", pa.string()), ("indicator", pa.string()), ("value", pa.float64()),
+            ("unit", pa.string()), ("record_date", _TIMESTAMP), ("source_id", pa.int32()),
+            ("geographical_area", pa.string()), ("metadata", pa.string()), ("created_at", _TIMESTAMP)
+        ]),
+        time_column="record_date",
+        filters=frozenset({"indicator", "category", "geographical_area", "source_id"})
+    ),
+    "yemen_sentiment_logs": ExportSpec(
+        schema=pa.schema([
+            ("id", pa.int64()), ("source_id", pa.int32()), ("category", pa.string()), ("intensity", pa.float64()),
+            ("keywords_found", pa.list_(pa.string())), ("geotag", pa.string()), ("recorded_at", _TIMESTAMP)
+        ]),
+        time_column="recorded_at",
+        filters=frozenset({"category", "geotag", "source_id"})
+    )
+}
+
+def build_export_query(table: str, columns: Optional[List[str]], start: Optional[datetime], end: Optional[datetime],
+                       filters: Dict[str, object]):
+    """Returns (sql, args, projected schema); raises ValueError for unknown columns or filters.
+
+    Only names from the table's schema are ever interpolated into the SQL.
+    """
+    spec = EXPORT_TABLES[table]
+    names = columns or spec.schema.names
+    unknown = [name for name in names if name not in spec.schema.names]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table}: {', '.join(unknown)}")
+    unsupported = [name for name in filters if name not in spec.filters]
+    if unsupported:
+        raise ValueError(f"Unsupported filters for {table}: {', '.join(unsupported)}")
+
+    conditions, args = [], []
+    for column, op, value in [(spec.time_column, ">=", start), (spec.time_column, "<=", end),
+                              *((name, "=", value) for name, value in filters.items())]:
+        if value is not None:
+            args.append(value)
+            conditions.append(f"{column} {op} ${len(args)}")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"SELECT {', '.join(names)} FROM {table} {where} ORDER BY {spec.time_column}"
+    return sql, args, pa.schema([spec.schema.field(name) for name in names])
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain().
+
+    tell() keeps counting across drains, which the Parquet writer relies on for its footer offsets.
+    """
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+class _Encoder:
+    """Turns row batches into Arrow IPC stream or Parquet bytes (one row group per batch)."""
+
+    def __init__(self, schema: pa.Schema, fmt: str):
+        self.schema = schema
+        self.sink = _ChunkSink()
+        if fmt == "parquet":
+            self.writer = pq.ParquetWriter(self.sink, schema, compression="zstd")
+        else:
+            self.writer = pa.ipc.new_stream(self.sink, schema)
+
+    def encode(self, rows: list) -> bytes:
+        columns = [pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(self.schema)]
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+async def stream_export(conn, sql: str, args: list, schema: pa.Schema, fmt: str,
+                        batch_rows: int = EXPORT_BATCH_ROWS) -> AsyncIterator[bytes]:
+    """Yields the encoded export; `conn` must stay checked out until the iterator is exhausted."""
+    encoder = _Encoder(schema, fmt)
+    async with conn.transaction():
+        cursor = await conn.cursor(sql, *args)
+        while rows := await cursor.fetch(batch_rows):
+            # Columnar conversion and compression happen off the event loop
+            yield await asyncio.to_thread(encoder.encode, rows)
+    yield await asyncio.to_thread(encoder.finish)
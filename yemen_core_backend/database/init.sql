@@ -14,7 +14,20 @@ CREATE TABLE IF NOT EXISTS data_sources (
     is_active BOOLEAN DEFAULT true,
     fetch_frequency VARCHAR(50) DEFAULT 'daily', 
     credentials TEXT, 
-    last_crawled_at TIMESTAMP WITH TIME ZONE
+    last_crawled_at TIMESTAMP WITH TIME ZONE,
+    last_status VARCHAR(20), -- 'success' / 'error' of the last connector run
+    last_run_log TEXT
+);
+
+-- Administrative geography (GeoNames governorates and districts)
+CREATE TABLE IF NOT EXISTS yemen_geography (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    admin_level VARCHAR(20) NOT NULL, -- 'governorate', 'district'
+    geoname_id BIGINT UNIQUE NOT NULL,
+    latitude FLOAT,
+    longitude FLOAT,
+    population BIGINT
 );
 
 -- Sentiment Tracking (Strategic Anger/Hate Index)
@@ -54,5 +67,65 @@ CREATE TABLE IF NOT EXISTS yemen_stats (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- One row per observation; the webhook bulk loader upserts on this key (PostgreSQL 15+ for NULLS NOT DISTINCT).
+-- Its (indicator, record_date) prefix also serves raw range queries on an indicator
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stats_observation
+    ON yemen_stats (indicator, record_date, geographical_area, source_id) NULLS NOT DISTINCT;
+
+-- Downsampled yemen_stats per UTC day/month/year, refreshed for the touched buckets on every bulk load
+CREATE TABLE IF NOT EXISTS yemen_stats_rollup (
+    indicator VARCHAR(255) NOT NULL,
+    bucket VARCHAR(5) NOT NULL CHECK (bucket IN ('day', 'month', 'year')),
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    geographical_area VARCHAR(255),
+    unit VARCHAR(50),
+    samples INTEGER NOT NULL,
+    value_sum FLOAT NOT NULL,
+    value_min FLOAT NOT NULL,
+    value_max FLOAT NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stats_rollup
+    ON yemen_stats_rollup (indicator, bucket, bucket_start, geographical_area, unit) NULLS NOT DISTINCT;
+
+-- Knowledge documents; `embedding` is the normalized mean of the document's chunk embeddings
+CREATE TABLE IF NOT EXISTS yemen_docs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    title TEXT NOT NULL,
+    source_id INTEGER REFERENCES data_sources(id),
+    publish_date TIMESTAMP WITH TIME ZONE,
+    full_content TEXT,
+    embedding vector(768), -- BAAI/bge-base-en-v1.5
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Arabic-aware normalization for full-text search: strips tatweel and harakat and folds
+-- alef/yeh/teh marbuta variants, so spelling variants of a name match the same lexeme
+CREATE OR REPLACE FUNCTION yemen_normalize_ar(input TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT translate(
+        regexp_replace(input, '[\u0640\u064B-\u065F\u0670]', '', 'g'),
+        'أإآٱىة', 'اااايه'
+    )
+$$;
+
+-- Retrieval unit for semantic and lexical search: one row per chunk
+CREATE TABLE IF NOT EXISTS yemen_doc_chunks (
+    doc_id UUID NOT NULL REFERENCES yemen_docs(id) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    embedding vector(768) NOT NULL,
+    -- 'simple' config: no stemming, so names and case numbers match exactly in both scripts
+    search_tsv tsvector GENERATED ALWAYS AS (to_tsvector('simple', yemen_normalize_ar(content))) STORED,
+    PRIMARY KEY (doc_id, ordinal)
+);
+
+-- Approximate nearest-neighbour index: search latency stays flat as chunks grow
+CREATE INDEX IF NOT EXISTS idx_doc_chunks_embedding_hnsw
+    ON yemen_doc_chunks USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Inverted index for full-text (lexical and hybrid) search
+CREATE INDEX IF NOT EXISTS idx_doc_chunks_search_tsv ON yemen_doc_chunks USING gin (search_tsv);
+
 CREATE INDEX IF NOT EXISTS idx_sentiment_time ON yemen_sentiment_logs(recorded_at DESC);
 CREATE INDEX IF NOT EXISTS idx_shadow_loc ON yemen_osint_shadows(location_name);
@@ -1,47 +1,72 @@
+import os
+import asyncio
+from ingestion_engines.connector_base import Connector, SourceClient, run_connectors, write_stats
 
-import requests
-import json
-from datetime import datetime
+# This script is meant to be run as a scheduled job (Cron/Celery), from yemen_core_backend/:
+#   python -m ingestion_engines.world_bank_connector
+# It fetches all indicators in parallel and bulk-loads them into yemen_stats
 
-# This script is meant to be run as a scheduled job (Cron/Celery)
-# It fetches data and pushes it to the internal API or DB directly
-
-API_BASE_URL = "http://localhost:8001/api/v1/core/ingest/webhook" # Internal Docker network address
-WB_API_URL = "https://api.worldbank.org/v2/country/yem/indicator/"
+WB_API_URL = os.getenv("WB_API_URL", "https://api.worldbank.org/v2/country/yem/indicator/")
+WB_DATE_RANGE = "2000:2024"
+WB_PAGE_SIZE = 1000
 
 INDICATORS = {
     'NY.GDP.MKTP.CD': 'gdp_usd',
     'SP.POP.TOTL': 'population_total'
 }
 
-def fetch_and_ingest():
-    for code, internal_name in INDICATORS.items():
+def _next_page(page, params):
+    # Response shape: [{"page": 1, "pages": 3, ...}, [entries]] or [{"message": [...]}] on error
+    meta = page[0] if isinstance(page, list) and page else {}
+    if int(meta.get("page", 1)) >= int(meta.get("pages", 1)):
+        return None
+    return {**params, "page": int(meta["page"]) + 1}
+
+class WorldBankConnector(Connector):
+    source_name = "World Bank API"
+    max_concurrency = 4 # the World Bank API throttles aggressive clients
+
+    def __init__(self, indicators=INDICATORS, date_range=WB_DATE_RANGE):
+        self.indicators = indicators
+        self.date_range = date_range
+
+    async def fetch_indicator(self, http: SourceClient, code: str, internal_name: str) -> list:
         print(f"Fetching {internal_name}...")
-        response = requests.get(f"{WB_API_URL}{code}?date=2000:2024&format=json")
-        
-        if response.status_code == 200:
-            data = response.json()
-            if len(data) > 1:
-                # Transform data to internal format
-                records = []
-                for entry in data[1]:
-                    if entry['value'] is not None:
-                        records.append({
-                            "indicator": internal_name,
-                            "value": float(entry['value']),
-                            "date": f"{entry['date']}-01-01",
-                            "source": "World Bank"
-                        })
-                
-                # Push to Yemen Core
-                payload = {
-                    "source_name": "World Bank API",
-                    "data": records
-                }
-                # requests.post(API_BASE_URL, json=payload) 
-                print(f"Prepared {len(records)} records for ingestion.")
-        else:
-            print(f"Failed to fetch {code}")
+        records = []
+        params = {"date": self.date_range, "format": "json", "per_page": WB_PAGE_SIZE, "page": 1}
+        async for page in http.paginate(f"{WB_API_URL}{code}", params, _next_page):
+            meta = page[0] if isinstance(page, list) and page else {}
+            if "message" in meta: # the World Bank reports errors (e.g. unknown indicator) with HTTP 200
+                details = "; ".join(str(m.get("value", m)) for m in meta["message"] if isinstance(m, dict))
+                raise RuntimeError(f"World Bank error for {code}: {details or meta['message']}")
+            if len(page) < 2 or not page[1]:
+                break
+            # Transform data to internal format
+            for entry in page[1]:
+                if entry['value'] is not None:
+                    records.append({
+                        "indicator": internal_name,
+                        "value": float(entry['value']),
+                        "date": f"{entry['date']}-01-01",
+                        "unit": entry.get('unit') or None,
+                        "source": "World Bank",
+                        "wb_code": code
+                    })
+        print(f"Prepared {len(records)} records for {internal_name}.")
+        return records
+
+    async def run(self, http: SourceClient, db_pool) -> int:
+        batches = await asyncio.gather(
+            *(self.fetch_indicator(http, code, name) for code, name in self.indicators.items())
+        )
+        # One bulk load for the whole run
+        return await write_stats(db_pool, self.source_name, [record for batch in batches for record in batch])
+
+def fetch_and_ingest():
+    results = asyncio.run(run_connectors([WorldBankConnector()]))
+    for source, result in results.items():
+        if isinstance(result, Exception):
+            print(f"Failed to ingest {source}: {result}")
 
 if __name__ == "__main__":
     fetch_and_ingest()
@@ -1,24 +1,67 @@
 
 import os
+import copy
+import json
 import shutil
-from typing import List, Dict, Any
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException
-from pydantic import BaseModel
+import threading
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Any, Literal
+from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sentence_transformers import SentenceTransformer
 import asyncpg
-from unstructured.partition.pdf import partition_pdf
+from pdf_partition import partition_pdf_file
 from pathlib import Path
+from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware
+from embedding_cache import EmbeddingCache
+from chunking import iter_chunks, CHUNK_MAX_TOKENS
+import numpy as np
+from pgvector.asyncpg import register_vector
+from micro_batcher import MicroBatcher
+from ttl_cache import TTLCache
+from stats_ingest import WebhookSpool, StatsIngestWorker, load_ndjson_stream
+from columnar_export import MEDIA_TYPES, build_export_query, stream_export
 
 # --- Configuration ---
 DATABASE_URL = os.getenv("DATABASE_URL")
 # We use a high-performance open-source embedding model
 EMBEDDING_MODEL_NAME = "BAAI/bge-base-en-v1.5" 
+# Chunk candidates fetched from the HNSW index per requested document, and passages returned per document
+SEARCH_CANDIDATES_PER_DOC = int(os.getenv("SEARCH_CANDIDATES_PER_DOC", "4"))
+SEARCH_CHUNKS_PER_DOC = 3
+# pgvector caps hnsw.ef_search at 1000, which bounds the candidate count and therefore top_k
+HNSW_MAX_EF_SEARCH = 1000
+SEARCH_MAX_TOP_K = max(1, HNSW_MAX_EF_SEARCH // SEARCH_CANDIDATES_PER_DOC)
+# Reciprocal rank fusion constant for hybrid search (60 is the value from the original RRF paper)
+SEARCH_RRF_K = int(os.getenv("SEARCH_RRF_K", "60"))
+# Off-loop compute: PDF partitioning runs in worker processes, encoding in dedicated threads
+PARTITION_WORKERS = int(os.getenv("PARTITION_WORKERS", "2"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "2"))
+SEARCH_BATCH_MAX = int(os.getenv("SEARCH_BATCH_MAX", "32"))
+SEARCH_BATCH_WAIT_MS = float(os.getenv("SEARCH_BATCH_WAIT_MS", "5"))
+# Hot-query caches (per API process); RESULT_CACHE_SIZE=0 disables result caching
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))
+QUERY_CACHE_TTL_S = float(os.getenv("QUERY_CACHE_TTL_S", "3600"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1000"))
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", "300"))
+# Each running export holds a pooled connection for its whole duration
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "2"))
 
 # --- Pydantic Models for API Validation & Documentation ---
 class SearchQuery(BaseModel):
     query: str
-    top_k: int = 5
+    top_k: int = Field(5, ge=1, le=SEARCH_MAX_TOP_K)
+    # semantic: vector similarity; lexical: Arabic-normalized full-text; hybrid: both, fused by rank
+    mode: Literal["semantic", "lexical", "hybrid"] = "semantic"
+
+class ChunkHit(BaseModel):
+    ordinal: int
+    score: float
+    content: str
 
 class SearchResult(BaseModel):
     id: str
@@ -26,11 +69,17 @@ class SearchResult(BaseModel):
     publish_date: str | None
     score: float
     content_snippet: str
+    chunks: List[ChunkHit] = [] # best matching passages of this document, best first
 
 class StatisticResult(BaseModel):
     record_date: str
-    value: float
+    value: float # bucket mean when downsampled
     unit: str | None
+    geographical_area: str | None = None
+    # Only set for bucketed results
+    samples: int | None = None
+    min: float | None = None
+    max: float | None = None
 
 class IngestWebhookPayload(BaseModel):
     source_name: str
@@ -62,53 +111,152 @@ app.add_middleware(
 # --- Global Resources ---
 db_pool = None
 embedding_model = None
+query_model = None
+embedding_cache = None
+partition_pool = None
+ingest_executor = None
+encode_executor = None
+search_executor = None
+query_batcher = None
+stats_spool = None
+stats_worker = None
+ingest_slots = asyncio.Semaphore(INGEST_CONCURRENCY)
+export_slots = asyncio.Semaphore(EXPORT_CONCURRENCY)
+query_embedding_cache = TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL_S)
+search_result_cache = TTLCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL_S)
+# Bumped after every ingest so cached results never outlive the index they came from
+index_version = 0
+
+def normalize_query(text: str) -> str:
+    # The embedding model is uncased, so case-folding does not change the vector
+    return " ".join(text.replace("\u0640", "").split()).casefold()
+
+def bump_index_version():
+    global index_version
+    index_version += 1
+    search_result_cache.clear()
 
 @app.on_event("startup")
 async def startup():
-    global db_pool, embedding_model
+    global db_pool, embedding_model, query_model, embedding_cache, partition_pool
+    global ingest_executor, encode_executor, search_executor, query_batcher
+    global stats_spool, stats_worker
     try:
-        db_pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=10)
+        db_pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=10, init=register_vector)
         print("Database connection pool created successfully.")
         # Load the model once into memory
         embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        # The fast tokenizer inside a model is not safe for concurrent use, so each model instance
+        # is only ever called from one thread: ingest encodes on encode_executor, search on its own copy
+        query_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
         print(f"Embedding model '{EMBEDDING_MODEL_NAME}' loaded.")
+        embedding_cache = EmbeddingCache()
+        # 'spawn' workers start clean and only import pdf_partition, not this module's model and app
+        partition_pool = ProcessPoolExecutor(PARTITION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        ingest_executor = ThreadPoolExecutor(INGEST_CONCURRENCY, thread_name_prefix="ingest-chunk")
+        encode_executor = ThreadPoolExecutor(1, thread_name_prefix="ingest-encode")
+        search_executor = ThreadPoolExecutor(1, thread_name_prefix="search-encode")
+        # Concurrent search queries share one encode() call
+        query_batcher = MicroBatcher(query_model.encode, search_executor, SEARCH_BATCH_MAX, SEARCH_BATCH_WAIT_MS)
+        # Webhook payloads are spooled to disk first and loaded into yemen_stats in the background
+        stats_spool = WebhookSpool()
+        stats_worker = StatsIngestWorker(stats_spool, db_pool)
+        stats_worker.start()
     except Exception as e:
         print(f"FATAL: Could not initialize resources: {e}")
 
 @app.on_event("shutdown")
 async def shutdown():
+    # Stop everything that uses the pool first, so the spool worker never claims a batch against a closed pool
+    if stats_worker:
+        await stats_worker.close()
+    if query_batcher:
+        await query_batcher.close()
     if db_pool:
         await db_pool.close()
+    if stats_spool:
+        stats_spool.close()
+    for executor in (partition_pool, ingest_executor, encode_executor, search_executor):
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
 
 # --- Background Task: PDF Processing & Embedding ---
+# Per-thread tokenizer copies for chunking: token counting never touches a model's own tokenizer
+_chunk_tokenizers = threading.local()
+
+def _count_tokens(text: str) -> int:
+    tokenizer = getattr(_chunk_tokenizers, "tokenizer", None)
+    if tokenizer is None:
+        tokenizer = _chunk_tokenizers.tokenizer = copy.deepcopy(embedding_model.tokenizer)
+    return len(tokenizer.tokenize(text))
+
+def _chunk(elements: list):
+    """Runs on the ingest chunk threads: token-aware chunking, counted with the embedding model's tokenizer."""
+    full_content = "\n\n".join([str(el) for el in elements])
+    chunks = [
+        chunk.text for chunk in iter_chunks(
+            elements,
+            max_tokens=min(CHUNK_MAX_TOKENS, embedding_model.max_seq_length - 2), # room for [CLS]/[SEP]
+            count_tokens=_count_tokens
+        )
+    ]
+    return full_content, chunks
+
+def _embed_chunks(chunks: List[str]) -> np.ndarray:
+    """Runs on the single ingest encode thread: (cached) chunk embeddings."""
+    chunk_vectors = embedding_cache.embed(EMBEDDING_MODEL_NAME, chunks, embedding_model.encode)
+    chunk_vectors /= np.linalg.norm(chunk_vectors, axis=1, keepdims=True) + 1e-12
+    return chunk_vectors
+
 async def process_and_embed_pdf(file_path: str, source_name: str):
     """
-    1. Extracts text from PDF using 'unstructured'.
+    1. Extracts text from PDF using 'unstructured' and splits it into semantic chunks.
     2. Generates vector embeddings using 'sentence-transformers'.
     3. Saves metadata, content, and vector to PostgreSQL.
+
+    Steps 1-2 run off the event loop, so ingestion never stalls search requests.
     """
     print(f"Starting PDF processing for {file_path} from source {source_name}...")
+    loop = asyncio.get_running_loop()
     try:
-        # 1. Extraction (Simplified for this example)
-        elements = partition_pdf(filename=file_path, strategy="hi_res")
-        full_content = "\n\n".join([str(el) for el in elements])
-        
-        # 2. Embedding
-        embedding = embedding_model.encode(full_content).tolist()
+        async with ingest_slots:
+            # 1. Extraction in a worker process
+            elements = await loop.run_in_executor(partition_pool, partition_pdf_file, file_path)
+
+            # 2. Chunking on the ingest threads, then embedding per chunk (cached by content)
+            full_content, chunks = await loop.run_in_executor(ingest_executor, _chunk, elements)
+            if chunks:
+                chunk_vectors = await loop.run_in_executor(encode_executor, _embed_chunks, chunks)
+        if not chunks:
+            print(f"No text extracted from {file_path}; skipping.")
+            return
+
+        # The document vector is the normalized mean of its chunks, instead of one encode()
+        # of the whole text that the model silently truncates
+        doc_vector = chunk_vectors.mean(axis=0)
+        embedding = doc_vector / (np.linalg.norm(doc_vector) + 1e-12)
         
-        # 3. Storage
+        # 3. Storage: the document row plus one indexed row per chunk, atomically
         async with db_pool.acquire() as conn:
             # Find source ID
             source_id_record = await conn.fetchrow("SELECT id FROM data_sources WHERE name = $1", source_name)
             source_id = source_id_record['id'] if source_id_record else None
             
-            await conn.execute(
-                """
-                INSERT INTO yemen_docs (title, source_id, full_content, embedding)
-                VALUES ($1, $2, $3, $4)
-                """,
-                Path(file_path).name, source_id, full_content, embedding
-            )
+            async with conn.transaction():
+                doc_id = await conn.fetchval(
+                    """
+                    INSERT INTO yemen_docs (title, source_id, full_content, embedding)
+                    VALUES ($1, $2, $3, $4)
+                    RETURNING id
+                    """,
+                    Path(file_path).name, source_id, full_content, embedding
+                )
+                await conn.copy_records_to_table(
+                    "yemen_doc_chunks",
+                    records=[(doc_id, i, chunk, vector) for i, (chunk, vector) in enumerate(zip(chunks, chunk_vectors))],
+                    columns=["doc_id", "ordinal", "content", "embedding"]
+                )
+        bump_index_version()
         print(f"Successfully processed and stored {file_path}")
         
     except Exception as e:
@@ -152,61 +300,232 @@ async def ingest_pdf(background_tasks: BackgroundTasks, source: str = "Manual Up
     
     return {"message": "PDF received. Processing and indexing started in background.", "filename": file.filename}
 
+async def _vector_hits(conn, query_embedding, limit: int) -> List[tuple]:
+    """(doc_id, ordinal, content, similarity) from the HNSW index, best first."""
+    # The HNSW scan returns at most ef_search rows; widen it to the candidate count
+    await conn.execute(f"SET LOCAL hnsw.ef_search = {min(max(40, limit), HNSW_MAX_EF_SEARCH)}")
+    # Uses the <=> operator for cosine distance provided by pgvector
+    hits = await conn.fetch(
+        """
+        SELECT doc_id, ordinal, content, 1 - (embedding <=> $1) AS score
+        FROM yemen_doc_chunks
+        ORDER BY embedding <=> $1
+        LIMIT $2
+        """,
+        query_embedding, limit
+    )
+    return [tuple(hit) for hit in hits]
+
+async def _lexical_hits(conn, query_text: str, limit: int) -> List[tuple]:
+    """(doc_id, ordinal, content, rank) from the full-text GIN index, best first."""
+    # websearch syntax: quoted phrases match exactly, -term excludes
+    hits = await conn.fetch(
+        """
+        SELECT doc_id, ordinal, content, ts_rank_cd(search_tsv, q) AS score
+        FROM yemen_doc_chunks, websearch_to_tsquery('simple', yemen_normalize_ar($1)) AS q
+        WHERE search_tsv @@ q
+        ORDER BY score DESC
+        LIMIT $2
+        """,
+        query_text, limit
+    )
+    return [tuple(hit) for hit in hits]
+
+def _fuse_rrf(*rankings: List[tuple]) -> List[tuple]:
+    """Reciprocal rank fusion of chunk rankings; the score is sum(1 / (k + rank))."""
+    fused: Dict[tuple, list] = {}
+    for ranking in rankings:
+        for rank, (doc_id, ordinal, content, _) in enumerate(ranking, start=1):
+            entry = fused.setdefault((doc_id, ordinal), [doc_id, ordinal, content, 0.0])
+            entry[3] += 1 / (SEARCH_RRF_K + rank)
+    return sorted((tuple(entry) for entry in fused.values()), key=lambda hit: hit[3], reverse=True)
+
 @app.post("/api/v1/core/search", response_model=List[SearchResult], tags=["Knowledge Access"])
 async def semantic_search(query: SearchQuery):
     """
-    Perform a semantic search across all indexed documents using vector similarity (Cosine Distance).
-    Returns the most relevant text snippets.
+    Search all indexed document chunks by vector similarity (Cosine Distance), full-text, or both.
+    Chunks are served from the HNSW / GIN indexes and grouped per document; returns the most relevant passages.
+    Scores are cosine similarity (semantic), ts_rank_cd (lexical) or the fused RRF score (hybrid).
     """
-    query_embedding = embedding_model.encode(query.query).tolist()
-    
+    query_text = normalize_query(query.query)
+    result_key = (query_text, query.top_k, query.mode, index_version)
+    cached = search_result_cache.get(result_key)
+    if cached is not None:
+        return cached
+
+    query_embedding = None
+    if query.mode != "lexical":
+        query_embedding = query_embedding_cache.get(query_text)
+        if query_embedding is None:
+            query_embedding = await query_batcher.submit(query_text)
+            query_embedding_cache.put(query_text, query_embedding)
+    candidates = query.top_k * SEARCH_CANDIDATES_PER_DOC
+
     async with db_pool.acquire() as conn:
-        # Uses the <=> operator for cosine distance provided by pgvector
-        results = await conn.fetch(
-            """
-            SELECT id, title, publish_date, embedding <=> $1 AS distance, full_content
-            FROM yemen_docs
-            ORDER BY embedding <=> $1
-            LIMIT $2
-            """,
-            query_embedding, query.top_k
+        async with conn.transaction():
+            if query.mode == "semantic":
+                hits = await _vector_hits(conn, query_embedding, candidates)
+            elif query.mode == "lexical":
+                hits = await _lexical_hits(conn, query_text, candidates)
+            else:
+                hits = _fuse_rrf(
+                    await _vector_hits(conn, query_embedding, candidates),
+                    await _lexical_hits(conn, query_text, candidates)
+                )
+
+        # Group by document, keeping documents in order of their best chunk
+        grouped: Dict[Any, List] = {}
+        for hit in hits:
+            if hit[0] in grouped or len(grouped) < query.top_k:
+                grouped.setdefault(hit[0], []).append(hit)
+
+        docs = await conn.fetch(
+            "SELECT id, title, publish_date FROM yemen_docs WHERE id = ANY($1)", list(grouped)
         )
-        
-    return [
-        SearchResult(
-            id=str(r['id']),
-            title=r['title'],
-            publish_date=str(r['publish_date']) if r['publish_date'] else None,
-            score=1 - r['distance'], # Convert distance to similarity score
-            content_snippet=r['full_content'][:300] + "..." if r['full_content'] else ""
-        ) for r in results
-    ]
+    docs = {d['id']: d for d in docs}
+
+    results = []
+    for doc_id, doc_hits in grouped.items():
+        if doc_id not in docs:
+            continue
+        best = doc_hits[0][2]
+        results.append(SearchResult(
+            id=str(doc_id),
+            title=docs[doc_id]['title'],
+            publish_date=str(docs[doc_id]['publish_date']) if docs[doc_id]['publish_date'] else None,
+            score=doc_hits[0][3],
+            content_snippet=best[:300] + "..." if len(best) > 300 else best,
+            chunks=[
+                ChunkHit(ordinal=ordinal, score=score, content=content)
+                for _, ordinal, content, score in doc_hits[:SEARCH_CHUNKS_PER_DOC]
+            ]
+        ))
+    search_result_cache.put(result_key, results)
+    return results
 
 @app.get("/api/v1/core/statistic/{indicator}", response_model=List[StatisticResult], tags=["Knowledge Access"])
-async def get_statistic(indicator: str):
-    """Retrieve time-series data for a specific indicator (e.g., 'gdp_usd')."""
+async def get_statistic(indicator: str, start: datetime | None = None, end: datetime | None = None,
+                        geographical_area: str | None = None,
+                        bucket: Literal["day", "month", "year"] | None = None):
+    """
+    Retrieve time-series data for a specific indicator (e.g., 'gdp_usd'), optionally limited to
+    [start, end] and one geographical area. With `bucket`, rows are downsampled per UTC day/month/year
+    (mean, min, max, sample count) from the precomputed rollups instead of returned raw.
+    """
     async with db_pool.acquire() as conn:
-        records = await conn.fetch(
-            """
-            SELECT record_date, value, unit 
-            FROM yemen_stats 
-            WHERE indicator = $1 
-            ORDER BY record_date ASC
-            """,
-            indicator
-        )
+        if bucket:
+            records = await conn.fetch(
+                """
+                SELECT bucket_start AS record_date, value_sum / samples AS value, unit, geographical_area,
+                       samples, value_min, value_max
+                FROM yemen_stats_rollup
+                WHERE indicator = $1 AND bucket = $2
+                  AND ($3::timestamptz IS NULL OR bucket_start >= date_trunc($2, $3::timestamptz, 'UTC'))
+                  AND ($4::timestamptz IS NULL OR bucket_start <= $4)
+                  AND ($5::text IS NULL OR geographical_area = $5)
+                ORDER BY bucket_start ASC, geographical_area
+                """,
+                indicator, bucket, start, end, geographical_area
+            )
+        else:
+            records = await conn.fetch(
+                """
+                SELECT record_date, value, unit, geographical_area
+                FROM yemen_stats 
+                WHERE indicator = $1
+                  AND ($2::timestamptz IS NULL OR record_date >= $2)
+                  AND ($3::timestamptz IS NULL OR record_date <= $3)
+                  AND ($4::text IS NULL OR geographical_area = $4)
+                ORDER BY record_date ASC
+                """,
+                indicator, start, end, geographical_area
+            )
         
     return [
         StatisticResult(
             record_date=str(r['record_date']),
             value=r['value'],
-            unit=r['unit']
+            unit=r['unit'],
+            geographical_area=r['geographical_area'],
+            samples=r['samples'] if bucket else None,
+            min=r['value_min'] if bucket else None,
+            max=r['value_max'] if bucket else None
         ) for r in records
     ]
 
+@app.get("/api/v1/core/export/{table}", tags=["Knowledge Access"])
+async def export_table(table: Literal["yemen_stats", "yemen_sentiment_logs"],
+                       format: Literal["arrow", "parquet"] = "arrow", columns: str | None = None,
+                       start: datetime | None = None, end: datetime | None = None,
+                       indicator: str | None = None, category: str | None = None,
+                       geographical_area: str | None = None, geotag: str | None = None,
+                       source_id: int | None = None):
+    """
+    Bulk export for analysts as an Arrow IPC stream or Parquet file (e.g. `pandas.read_parquet`).
+    `columns` is a comma-separated projection; start/end filter on the table's time column.
+    Rows are read from a server-side cursor and encoded batch by batch, so the export is never held in memory.
+    """
+    filters = {
+        name: value for name, value in (
+            ("indicator", indicator), ("category", category), ("geographical_area", geographical_area),
+            ("geotag", geotag), ("source_id", source_id)
+        ) if value is not None
+    }
+    projection = [name.strip() for name in columns.split(",") if name.strip()] if columns else None
+    try:
+        sql, args, schema = build_export_query(table, projection, start, end, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def export_stream():
+        async with export_slots:
+            async with db_pool.acquire() as conn:
+                async for chunk in stream_export(conn, sql, args, schema, format):
+                    yield chunk
+
+    extension = "arrows" if format == "arrow" else "parquet"
+    return StreamingResponse(
+        export_stream(), media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{extension}"'}
+    )
+
 @app.post("/api/v1/core/ingest/webhook", status_code=202, tags=["Ingestion"])
 async def ingest_from_webhook(payload: IngestWebhookPayload):
     """Universal webhook for scrapers (Scrapy) to push structured JSON data."""
-    # Logic to map JSON payload to yemen_stats would go here
-    print(f"Received {len(payload.data)} records from {payload.source_name}. Processing...")
-    return {"message": "Data received and queued for normalization and storage."}
+    # Durably spooled before we answer; normalization and the bulk load into yemen_stats happen in the background
+    batch_id = await asyncio.to_thread(stats_spool.push, payload.source_name, payload.data)
+    stats_worker.notify()
+    print(f"Received {len(payload.data)} records from {payload.source_name}. Spooled as batch {batch_id}.")
+    return {"message": "Data received and queued for normalization and storage.", "batch_id": batch_id}
+
+@app.post("/api/v1/core/ingest/ndjson", tags=["Ingestion"])
+async def ingest_ndjson(request: Request, source_name: str):
+    """
+    Bulk ingestion for large scraper dumps: one JSON record per line, optionally gzip'd
+    (`Content-Encoding: gzip` or `Content-Type: application/gzip`).
+    The body is read, validated and loaded in batches as it arrives, so memory use does not
+    depend on payload size. Responds with the final done/error summary and the first row errors.
+    """
+    gzipped = (
+        request.headers.get("content-encoding", "").lower() == "gzip"
+        or request.headers.get("content-type", "").split(";")[0].strip() in ("application/gzip", "application/x-gzip")
+    )
+
+    # The body is consumed here, not inside a StreamingResponse: Starlette's disconnect listener
+    # would otherwise read from the same receive channel and drop body chunks
+    row_errors, result = [], None
+    async for event in load_ndjson_stream(db_pool, source_name, request.stream(), gzipped):
+        if event["status"] == "row_error":
+            row_errors.append({"line": event["line"], "error": event["error"]})
+        elif event["status"] in ("done", "error"):
+            result = event
+    print(f"NDJSON load from {source_name}: {result}")
+    return {**result, "row_errors": row_errors}
+
+@app.get("/api/v1/core/ingest/webhook/{batch_id}", tags=["Ingestion"])
+async def get_webhook_batch(batch_id: int):
+    """Load status of a spooled webhook batch: rows upserted, rows rejected and why."""
+    status = await asyncio.to_thread(stats_spool.status, batch_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch {batch_id}")
+    return status
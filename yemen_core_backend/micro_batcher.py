@@ -0,0 +1,55 @@
+# yemen_core_backend/micro_batcher.py
+# Coalesces concurrent single-item requests (e.g. search queries) into one batched model call.
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Sequence
+
+class MicroBatcher:
+    """Collects items for up to `max_wait_ms` (or `max_batch` items) and runs `batch_fn` once on `executor`."""
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]], executor: Executor,
+                 max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue = None
+        self._worker: asyncio.Task = None
+
+    async def submit(self, item: Any) -> Any:
+        if self._worker is None or self._worker.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await loop.run_in_executor(self.executor, self.batch_fn, [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
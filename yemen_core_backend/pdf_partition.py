@@ -0,0 +1,9 @@
+# yemen_core_backend/pdf_partition.py
+# Entry point for the PDF partition worker processes. Kept out of main.py so that spawned workers
+# import only `unstructured`, not the embedding model, the FastAPI app or the rest of main.py.
+
+from unstructured.partition.pdf import partition_pdf
+
+def partition_pdf_file(file_path: str) -> list:
+    """Runs in a partition worker process."""
+    return partition_pdf(filename=file_path, strategy="hi_res")
@@ -0,0 +1,442 @@
+# yemen_core_backend/stats_ingest.py
+# Bulk loading of scraper/webhook records into yemen_stats:
+# durable write-ahead spool -> normalization -> COPY into a staging table -> set-based upsert.
+
+import os
+import json
+import math
+import time
+import zlib
+import sqlite3
+import asyncio
+import threading
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+INGEST_SPOOL_PATH = os.getenv("INGEST_SPOOL_PATH", os.path.expanduser("~/.cache/yemen_core/ingest_spool.sqlite3"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+INGEST_RETRY_BASE_S = float(os.getenv("INGEST_RETRY_BASE_S", "10"))
+# A claimed batch that is neither acked nor retried within the lease (crashed worker) is picked up again
+INGEST_LEASE_S = float(os.getenv("INGEST_LEASE_S", "300"))
+INGEST_POLL_INTERVAL_S = 5.0
+SPOOL_KEEP_DONE_S = 24 * 3600
+MAX_REPORTED_ERRORS = 20
+# Streaming NDJSON loads: records per COPY/upsert transaction, and the longest accepted line
+NDJSON_BATCH_ROWS = int(os.getenv("NDJSON_BATCH_ROWS", "5000"))
+NDJSON_MAX_LINE_BYTES = int(os.getenv("NDJSON_MAX_LINE_BYTES", str(1024 * 1024)))
+_INFLATE_STEP_BYTES = 1024 * 1024
+
+# Row layout of the staging table, in COPY order
+STAGING_COLUMNS = ["seq", "category", "indicator", "value", "unit", "record_date", "geographical_area", "metadata"]
+DEFAULT_CATEGORY = "general"
+# Record keys mapped onto columns; anything else is kept in `metadata`
+_FIELD_ALIASES = {
+    "category": "category", "indicator": "indicator", "value": "value", "unit": "unit",
+    "record_date": "record_date", "date": "record_date",
+    "geographical_area": "geographical_area", "area": "geographical_area"
+}
+_MAX_LENGTHS = {"category": 100, "indicator": 255, "unit": 50, "geographical_area": 255}
+
+# --- Normalization ---
+
+def _parse_date(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit()):
+        parsed = datetime(int(value), 1, 1) # year-only series (World Bank, UN)
+    elif isinstance(value, str):
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    else:
+        raise ValueError(f"unsupported date {value!r}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def normalize_stat_record(record: Dict[str, Any], seq: int) -> tuple:
+    """Maps one raw record onto a staging row; raises ValueError if it cannot be stored."""
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    fields, extra = {}, {}
+    for key, value in record.items():
+        column = _FIELD_ALIASES.get(key)
+        if column and column not in fields:
+            fields[column] = value
+        else:
+            extra[key] = value
+
+    indicator = str(fields.get("indicator") or "").strip()
+    if not indicator:
+        raise ValueError("missing indicator")
+    if fields.get("value") is None or isinstance(fields["value"], bool):
+        raise ValueError("missing value")
+    value = float(fields["value"])
+    if not math.isfinite(value):
+        raise ValueError(f"non-finite value {fields['value']!r}")
+    if fields.get("record_date") is None:
+        raise ValueError("missing record_date")
+
+    row = {
+        "category": str(fields.get("category") or DEFAULT_CATEGORY).strip(),
+        "indicator": indicator,
+        "unit": str(fields["unit"]).strip() if fields.get("unit") is not None else None,
+        "geographical_area": str(fields["geographical_area"]).strip() if fields.get("geographical_area") else None,
+    }
+    for column, limit in _MAX_LENGTHS.items():
+        if row[column] is not None and len(row[column]) > limit:
+            raise ValueError(f"{column} longer than {limit} characters")
+
+    return (
+        seq, row["category"], row["indicator"], value, row["unit"], _parse_date(fields["record_date"]),
+        row["geographical_area"], json.dumps(extra, default=str) if extra else None
+    )
+
+def normalize_stat_records(records: Iterable[Dict[str, Any]], start: int = 0) -> Tuple[List[tuple], List[Dict]]:
+    """Returns (staging rows, [{"row": index, "error": message}, ...]) for a batch of raw records."""
+    rows, errors = [], []
+    for index, record in enumerate(records, start=start):
+        try:
+            rows.append(normalize_stat_record(record, index))
+        except (ValueError, TypeError) as e:
+            errors.append({"row": index, "error": str(e)})
+    return rows, errors
+
+# --- Bulk writer ---
+
+async def resolve_source_id(conn, source_name: str) -> Optional[int]:
+    return await conn.fetchval("SELECT id FROM data_sources WHERE name = $1", source_name)
+
+async def bulk_upsert_stats(conn, source_id: Optional[int], rows: List[tuple]) -> int:
+    """COPYs rows into a per-connection staging table and merges them into yemen_stats in one statement.
+
+    Must run inside a transaction. Within a batch the last record for an observation wins;
+    returns the number of inserted or changed rows.
+    """
+    if not rows:
+        return 0
+    await conn.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS stats_staging (
+            seq BIGINT,
+            category VARCHAR(100),
+            indicator VARCHAR(255),
+            value FLOAT,
+            unit VARCHAR(50),
+            record_date TIMESTAMP WITH TIME ZONE,
+            geographical_area VARCHAR(255),
+            metadata JSONB
+        ) ON COMMIT DELETE ROWS
+        """
+    )
+    await conn.copy_records_to_table("stats_staging", records=rows, columns=STAGING_COLUMNS)
+    status = await conn.execute(
+        """
+        INSERT INTO yemen_stats (category, indicator, value, unit, record_date, source_id, geographical_area, metadata)
+        SELECT DISTINCT ON (indicator, record_date, geographical_area)
+               category, indicator, value, unit, record_date, $1::integer, geographical_area, metadata
+        FROM stats_staging
+        ORDER BY indicator, record_date, geographical_area, seq DESC
+        ON CONFLICT (indicator, record_date, geographical_area, source_id) DO UPDATE SET
+            category = EXCLUDED.category, value = EXCLUDED.value,
+            unit = EXCLUDED.unit, metadata = EXCLUDED.metadata
+        WHERE (yemen_stats.category, yemen_stats.value, yemen_stats.unit, yemen_stats.metadata)
+              IS DISTINCT FROM (EXCLUDED.category, EXCLUDED.value, EXCLUDED.unit, EXCLUDED.metadata)
+        """,
+        source_id
+    )
+    changed = int(status.split()[-1])
+    if changed:
+        await refresh_stats_rollups(conn)
+    return changed
+
+# Buckets touched by the rows in stats_staging
+_TOUCHED_BUCKETS = """
+    SELECT DISTINCT s.indicator, b.bucket, date_trunc(b.bucket, s.record_date, 'UTC') AS bucket_start, s.geographical_area
+    FROM stats_staging s CROSS JOIN (VALUES ('day'), ('month'), ('year')) AS b(bucket)
+"""
+
+async def refresh_stats_rollups(conn):
+    """Recomputes the yemen_stats_rollup buckets touched by the current staging batch.
+
+    Loads serialize on a transaction-level advisory lock here, so each recompute sees every
+    row committed by earlier loads into the same buckets.
+    """
+    await conn.execute("SELECT pg_advisory_xact_lock(hashtext('yemen_stats_rollup'))")
+    await conn.execute(
+        f"""
+        DELETE FROM yemen_stats_rollup r
+        USING ({_TOUCHED_BUCKETS}) t
+        WHERE r.indicator = t.indicator AND r.bucket = t.bucket AND r.bucket_start = t.bucket_start
+          AND r.geographical_area IS NOT DISTINCT FROM t.geographical_area
+        """
+    )
+    await conn.execute(
+        f"""
+        INSERT INTO yemen_stats_rollup
+            (indicator, bucket, bucket_start, geographical_area, unit, samples, value_sum, value_min, value_max)
+        SELECT t.indicator, t.bucket, t.bucket_start, t.geographical_area, y.unit,
+               count(*), sum(y.value), min(y.value), max(y.value)
+        FROM ({_TOUCHED_BUCKETS}) t
+        JOIN yemen_stats y
+          ON y.indicator = t.indicator
+         AND y.record_date >= t.bucket_start
+         AND y.record_date < date_add(t.bucket_start, ('1 ' || t.bucket)::interval, 'UTC')
+         AND y.geographical_area IS NOT DISTINCT FROM t.geographical_area
+        GROUP BY t.indicator, t.bucket, t.bucket_start, t.geographical_area, y.unit
+        """
+    )
+
+# --- Streaming NDJSON ---
+
+async def _inflate(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """gzip-decodes a byte stream, at most `_INFLATE_STEP_BYTES` of output at a time.
+
+    Concatenated members (`cat a.gz b.gz`) are valid gzip and are decoded one after another.
+    """
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = chunk
+        while data:
+            if inflater.eof:
+                # Previous member ended; whatever followed it starts the next one
+                inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            out = inflater.decompress(data, _INFLATE_STEP_BYTES)
+            if out:
+                yield out
+            data = inflater.unconsumed_tail or (inflater.unused_data if inflater.eof else b"")
+    tail = inflater.flush()
+    if tail:
+        yield tail
+    if not inflater.eof:
+        raise ValueError("truncated gzip stream")
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], gzipped: bool = False) -> AsyncIterator[Tuple[int, Any, Optional[str]]]:
+    """Yields (line number, parsed record, error) per non-empty line, holding at most one line in memory."""
+    if gzipped:
+        chunks = _inflate(chunks)
+    buffer, line_no, skipping = b"", 0, False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if skipping:
+                # Tail of an over-long line
+                skipping = False
+                yield line_no, None, f"line longer than {NDJSON_MAX_LINE_BYTES} bytes"
+            elif line.strip():
+                yield (line_no, *_parse_line(line))
+        if len(buffer) > NDJSON_MAX_LINE_BYTES:
+            buffer, skipping = b"", True
+    if skipping or buffer.strip():
+        line_no += 1
+        yield (line_no, None, f"line longer than {NDJSON_MAX_LINE_BYTES} bytes") if skipping else (line_no, *_parse_line(buffer))
+
+def _parse_line(line: bytes) -> Tuple[Any, Optional[str]]:
+    try:
+        return json.loads(line), None
+    except ValueError as e:
+        return None, f"invalid JSON: {e}"
+
+async def load_ndjson_stream(db_pool, source_name: str, chunks: AsyncIterator[bytes], gzipped: bool = False,
+                             batch_rows: int = NDJSON_BATCH_ROWS) -> AsyncIterator[Dict]:
+    """Streams NDJSON records into yemen_stats in batches, yielding progress and row-error events.
+
+    Each batch is committed on its own; re-sending a payload is safe because loads are upserts.
+    """
+    rows_read = rows_loaded = rows_rejected = 0
+    pending: List[tuple] = []
+    source_id = None
+
+    async def flush():
+        nonlocal rows_loaded
+        async with db_pool.acquire() as conn:
+            async with conn.transaction():
+                rows_loaded += await bulk_upsert_stats(conn, source_id, pending)
+        pending.clear()
+
+    def summary(status: str, **extra) -> Dict:
+        return {"status": status, **extra, "rows_read": rows_read, "rows_loaded": rows_loaded,
+                "rows_rejected": rows_rejected}
+
+    try:
+        async with db_pool.acquire() as conn:
+            source_id = await resolve_source_id(conn, source_name)
+        async for line_no, record, error in iter_ndjson(chunks, gzipped):
+            rows_read += 1
+            if error is None:
+                try:
+                    pending.append(normalize_stat_record(record, line_no))
+                except (ValueError, TypeError) as e:
+                    error = str(e)
+            if error is not None:
+                rows_rejected += 1
+                if rows_rejected <= MAX_REPORTED_ERRORS:
+                    yield {"status": "row_error", "line": line_no, "error": error}
+            if len(pending) >= batch_rows:
+                await flush()
+                yield summary("progress")
+        if pending:
+            await flush()
+    except (ValueError, zlib.error) as e:
+        # Corrupt or truncated body: what was committed so far stays, the rest of this batch is dropped
+        yield summary("error", message=f"Unreadable payload: {e}")
+        return
+    except Exception as e:
+        # Database or connection failure: earlier batches stay committed, the current one is rolled back
+        yield summary("error", message=f"Database error: {e}")
+        return
+    yield summary("done")
+
+# --- Write-ahead spool ---
+
+class WebhookSpool:
+    """SQLite-backed spool of accepted webhook payloads, safe to share between API worker processes."""
+
+    def __init__(self, path: str = INGEST_SPOOL_PATH, max_attempts: int = INGEST_MAX_ATTEMPTS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS spooled_batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_name TEXT NOT NULL,
+                payload TEXT,
+                received_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                rows_loaded INTEGER,
+                rows_rejected INTEGER,
+                errors TEXT
+            )
+            """
+        )
+
+    def push(self, source_name: str, records: List[Dict[str, Any]]) -> int:
+        """Durably stores a payload; returns its batch id."""
+        payload = json.dumps(records, default=str)
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO spooled_batches (source_name, payload, received_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (source_name, payload, now, now)
+            )
+        return cursor.lastrowid
+
+    def claim(self) -> Optional[Dict]:
+        """Leases the oldest due batch to this process, or returns None."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    """
+                    SELECT id, source_name, payload, attempts FROM spooled_batches
+                    WHERE status = 'pending' AND next_attempt_at <= ?
+                    ORDER BY id LIMIT 1
+                    """,
+                    (now,)
+                ).fetchone()
+                if row:
+                    self._db.execute(
+                        "UPDATE spooled_batches SET next_attempt_at = ? WHERE id = ?", (now + INGEST_LEASE_S, row[0])
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"id": row[0], "source_name": row[1], "records": json.loads(row[2]), "attempts": row[3]}
+
+    def ack(self, batch: Dict, rows_loaded: int, errors: List[Dict]):
+        # The payload is dropped once loaded; the outcome is kept for the status endpoint
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE spooled_batches SET status = 'done', payload = NULL, rows_loaded = ?, rows_rejected = ?, errors = ?
+                WHERE id = ?
+                """,
+                (rows_loaded, len(errors), json.dumps(errors[:MAX_REPORTED_ERRORS]), batch["id"])
+            )
+            self._db.execute(
+                "DELETE FROM spooled_batches WHERE status = 'done' AND received_at < ?", (time.time() - SPOOL_KEEP_DONE_S,)
+            )
+
+    def retry(self, batch: Dict, error: str):
+        attempts = batch["attempts"] + 1
+        status = "dead" if attempts >= self.max_attempts else "pending"
+        with self._lock:
+            self._db.execute(
+                "UPDATE spooled_batches SET attempts = ?, status = ?, next_attempt_at = ?, errors = ? WHERE id = ?",
+                (attempts, status, time.time() + INGEST_RETRY_BASE_S * 2 ** (attempts - 1),
+                 json.dumps([{"error": error}]), batch["id"])
+            )
+        if status == "dead":
+            print(f"[Stats Ingest] Giving up on batch {batch['id']} after {attempts} attempts: {error}")
+
+    def status(self, batch_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, source_name, status, attempts, rows_loaded, rows_rejected, errors FROM spooled_batches WHERE id = ?",
+                (batch_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "source_name", "status", "attempts", "rows_loaded", "rows_rejected", "errors")
+        result = dict(zip(keys, row))
+        result["errors"] = json.loads(result["errors"]) if result["errors"] else []
+        return result
+
+    def close(self):
+        self._db.close()
+
+# --- Spool drainer ---
+
+class StatsIngestWorker:
+    """Event-loop task that drains the spool into PostgreSQL, one batch per transaction."""
+
+    def __init__(self, spool: WebhookSpool, db_pool):
+        self.spool = spool
+        self.db_pool = db_pool
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            batch = await asyncio.to_thread(self.spool.claim)
+            if batch is None:
+                # Other worker processes push to the same spool, so keep polling as well
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), INGEST_POLL_INTERVAL_S)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            await self._load(batch)
+
+    async def _load(self, batch: Dict):
+        try:
+            rows, errors = await asyncio.to_thread(normalize_stat_records, batch["records"])
+            async with self.db_pool.acquire() as conn:
+                source_id = await resolve_source_id(conn, batch["source_name"])
+                async with conn.transaction():
+                    loaded = await bulk_upsert_stats(conn, source_id, rows)
+        except Exception as e:
+            print(f"[Stats Ingest] Batch {batch['id']} from {batch['source_name']} failed: {e}")
+            await asyncio.to_thread(self.spool.retry, batch, str(e))
+            return
+        await asyncio.to_thread(self.spool.ack, batch, loaded, errors)
+        print(f"[Stats Ingest] Batch {batch['id']} from {batch['source_name']}: "
+              f"{loaded} rows upserted, {len(errors)} rejected.")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()